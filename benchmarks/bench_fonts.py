@@ -0,0 +1,57 @@
+"""timing comparison of font loading: plain TTFont parse vs cached metrics vs process-wide registry
+
+python -m benchmarks.bench_fonts [--repeat 5]
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from reportlab.pdfbase import ttfonts
+
+from cc_resume import fonts
+
+
+def timeit(func, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) / repeat
+
+
+def parse_ttf():
+    # what main.Fonts did for every CreatePdf before the registry
+    for name, path in fonts.FACES.items():
+        ttfonts.TTFont(name, path)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        # fill the on-disk cache once
+        fonts.FontRegistry().register(cache_dir)
+
+        def cold_start_with_cache():
+            fonts.FontRegistry().register(cache_dir)
+
+        registry = fonts.FontRegistry()
+        registry.register(cache_dir)
+
+        results = [
+            ('ttf parse (no cache)', timeit(parse_ttf, args.repeat)),
+            ('cold start, disk cache', timeit(cold_start_with_cache, args.repeat)),
+            ('warm registry', timeit(lambda: registry.register(cache_dir), args.repeat)),
+        ]
+        cache_size = os.path.getsize(os.path.join(cache_dir, fonts.CACHE_NAME))
+
+    base = results[0][1]
+    for name, seconds in results:
+        print(f'{name:<24} {seconds * 1000:10.3f} ms  x{base / seconds if seconds else float("inf"):.1f}')
+    print(f'metrics cache size {cache_size} bytes')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+"""section tables, layout and pdf time against the number of entries, table vs stream layout
+
+one long resume is laid out at a fixed font size and padding (it does not fit one page, every page is
+laid out), time per entry stays flat when the cost grows linearly.
+
+python -m benchmarks.bench_layout_scaling [--entries 10,25,50,100,200,400] [--modes table,stream]
+                                          [--repeat 3] [--output bench_layout_scaling.json]
+"""
+import argparse
+import io
+import json
+import time
+
+from benchmarks.generate import generate_resume
+
+
+def run(data, mode, font_size, padding):
+    from cc_resume import main
+    main.section_cache().clear()
+    timings = {}
+    start = time.perf_counter()
+    pdf = main.CreatePdf(font_size, padding, extra_leading=1, output_path=io.BytesIO(), data=data,
+                         title_color='orange', layout_mode=mode)
+    pdf.add_data()
+    timings['sections'] = time.perf_counter() - start
+    start = time.perf_counter()
+    layout = pdf.measure()
+    timings['layout'] = time.perf_counter() - start
+    start = time.perf_counter()
+    pdf.build(verbose=False)
+    timings['pdf'] = time.perf_counter() - start
+    timings['pages'] = layout.page
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--entries', default='10,25,50,100,200,400')
+    parser.add_argument('--modes', default='table,stream')
+    parser.add_argument('--descriptions', type=int, default=3)
+    parser.add_argument('--font-size', type=float, default=12)
+    parser.add_argument('--padding', type=float, default=5)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--output', default='bench_layout_scaling.json')
+    args = parser.parse_args()
+
+    from cc_resume.config import CONF
+    CONF([], default_config_files=[])
+    from cc_resume import main as render_main
+    render_main.Fonts()
+
+    results = []
+    print(f"{'entries':>7} {'mode':<6} {'pages':>5} {'sections ms':>11} {'layout ms':>10} {'pdf ms':>9} "
+          f"{'layout us/entry':>15}")
+    for entries in [int(v) for v in args.entries.split(',')]:
+        data = generate_resume(entries, args.descriptions, 120, 0.5)
+        for mode in args.modes.split(','):
+            runs = [run(data, mode, args.font_size, args.padding) for _ in range(args.repeat)]
+            best = {name: min(r[name] for r in runs) for name in ('sections', 'layout', 'pdf')}
+            result = dict(best, entries=entries, mode=mode, pages=runs[0]['pages'])
+            results.append(result)
+            print(f"{entries:>7} {mode:<6} {result['pages']:>5} {best['sections'] * 1000:>11.1f} "
+                  f"{best['layout'] * 1000:>10.1f} {best['pdf'] * 1000:>9.1f} "
+                  f"{best['layout'] / entries * 1e6:>15.1f}")
+
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump({'descriptions': args.descriptions, 'font_size': args.font_size, 'padding': args.padding,
+                   'repeat': args.repeat, 'results': results}, f, indent=2)
+    print(f'results are written to {args.output}')
+
+
+if __name__ == '__main__':
+    main()
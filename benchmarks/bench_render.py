@@ -0,0 +1,186 @@
+"""end to end and per phase timings of rendering synthetic resumes, results are written as json
+
+every case runs in a fresh process, so import, font registration and the first render are measured cold
+and peak RSS belongs to that case only.
+
+python -m benchmarks.bench_render [--entries 1,2,3] [--description-chars 80,200] [--cjk-ratio 0.5]
+                                  [--repeat 5] [--fit-workers 0] [--output bench_render.json]
+                                  [--compare old.json]
+"""
+import argparse
+import contextlib
+import itertools
+import json
+import multiprocessing
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from benchmarks.generate import generate_resume
+
+
+def peak_rss():
+    """peak resident set size of this process in bytes, None where the resource module is missing"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on linux, bytes on macos
+    return rss if sys.platform == 'darwin' else rss * 1024
+
+
+class Timer:
+    """with timer('name'): ... adds the elapsed seconds to timer.phases['name']"""
+
+    def __init__(self):
+        self.phases = {}
+
+    @contextlib.contextmanager
+    def __call__(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = self.phases.get(name, 0) + time.perf_counter() - start
+
+
+def run_case(case, repeat, fit_workers=0):
+    """runs in a fresh process, returns the result dict of one case"""
+    import yaml
+    timer = Timer()
+    with tempfile.TemporaryDirectory() as cache_dir:
+        yaml_path = os.path.join(cache_dir, 'bench.yaml')
+        with open(yaml_path, 'w', encoding='utf-8') as f:
+            yaml.safe_dump(generate_resume(**case), f, allow_unicode=True, sort_keys=False)
+
+        with timer('import'):
+            from cc_resume.config import CONF
+            from cc_resume import main, api
+            from cc_resume.fit import FitError
+        CONF([], default_config_files=[])
+        CONF.set_override('config_dir', cache_dir, group='resume')
+        CONF.set_override('force', True)
+        CONF.set_override('fit_workers', fit_workers)
+        with timer('fonts'):
+            main.Fonts(cache_dir)
+        with timer('yaml'):
+            data = main.load_resume(yaml_path, cache_dir)
+
+        result = {'case': case, 'ok': True, 'error': None}
+        end_to_end, layouts = [], []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            try:
+                fit = main.fit_one_page_pdf(yaml_path, verbose=False)
+            except FitError as e:
+                result.update(ok=False, error=str(e))
+                break
+            end_to_end.append(time.perf_counter() - start)
+            layouts.append(fit.layouts)
+        if not result['ok']:
+            result['peak_rss'] = peak_rss()
+            return result
+
+        # the same fit again from scratch, the phases come from cc_resume.metrics
+        main.section_cache().clear()
+        report = api.render(data, main.render_options(cache_dir=cache_dir)).metrics
+        for name, phase in report['phases'].items():
+            # import, fonts and yaml are already timed cold above
+            timer.phases.setdefault(name, phase['seconds'])
+
+        result.update(
+            end_to_end={'cold': end_to_end[0], 'warm': statistics.median(end_to_end[1:] or end_to_end)},
+            # the first fit searches from scratch, later ones start from the font size in the manifest
+            phases=timer.phases, layouts=layouts[0], warm_layouts=layouts[-1], font_size=fit.font_size,
+            padding=fit.padding, output_size=os.path.getsize(fit.output_path), peak_rss=peak_rss(),
+        )
+    return result
+
+
+def run_case_and_exit(case, repeat, fit_workers):
+    from cc_resume import api
+    try:
+        return run_case(case, repeat, fit_workers)
+    finally:
+        api.shutdown_fit_pools()
+
+
+def run_isolated(case, repeat, fit_workers=0):
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn')) as executor:
+        return executor.submit(run_case_and_exit, case, repeat, fit_workers).result()
+
+
+def case_name(case):
+    return f"e{case['entries']}-d{case['descriptions']}-c{case['description_chars']}-cjk{case['cjk_ratio']}"
+
+
+def print_results(results, baseline=None):
+    baseline = {case_name(r['case']): r for r in (baseline or {}).get('results', []) if r['ok']}
+    print(f"{'case':<24} {'layouts':>7} {'font':>6} {'cold ms':>9} {'warm ms':>9} {'fit ms':>8} {'pdf ms':>8} "
+          f"{'rss MiB':>8} {'bytes':>8}")
+    for r in results:
+        name = case_name(r['case'])
+        if not r['ok']:
+            print(f'{name:<24} failed, {r["error"]}')
+            continue
+        phases = r['phases']
+        line = f"{name:<24} {r['layouts']:>7} {r['font_size']:>6} {r['end_to_end']['cold'] * 1000:>9.1f} " \
+               f"{r['end_to_end']['warm'] * 1000:>9.1f} {phases['fit'] * 1000:>8.1f} {phases['pdf'] * 1000:>8.1f} " \
+               f"{(r['peak_rss'] or 0) / 2 ** 20:>8.1f} {r['output_size']:>8}"
+        old = baseline.get(name)
+        if old:
+            line += f"  warm x{old['end_to_end']['warm'] / r['end_to_end']['warm']:.2f} vs baseline"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--entries', default='1,2,3')
+    parser.add_argument('--descriptions', default='2')
+    parser.add_argument('--description-chars', default='80,200')
+    parser.add_argument('--cjk-ratio', default='0.5')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--fit-workers', type=int, default=0, help='parallel fit processes, see --fit_workers')
+    parser.add_argument('--output', default='bench_render.json')
+    parser.add_argument('--compare', help='json of an earlier run, warm end to end speedup is printed per case')
+    args = parser.parse_args()
+
+    matrix = itertools.product([int(v) for v in args.entries.split(',')],
+                               [int(v) for v in args.descriptions.split(',')],
+                               [int(v) for v in args.description_chars.split(',')],
+                               [float(v) for v in args.cjk_ratio.split(',')])
+    results = []
+    for entries, descriptions, description_chars, cjk_ratio in matrix:
+        case = {'entries': entries, 'descriptions': descriptions, 'description_chars': description_chars,
+                'cjk_ratio': cjk_ratio, 'seed': args.seed}
+        print(f'run {case_name(case)}')
+        results.append(run_isolated(case, args.repeat, args.fit_workers))
+
+    import reportlab
+    report = {
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'reportlab': reportlab.Version,
+        'platform': platform.platform(),
+        'repeat': args.repeat,
+        'fit_workers': args.fit_workers,
+        'results': results,
+    }
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    baseline = None
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+    print_results(results, baseline)
+    print(f'results are written to {args.output}')
+
+
+if __name__ == '__main__':
+    main()
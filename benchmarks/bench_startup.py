@@ -0,0 +1,63 @@
+"""startup time of the cc-resume entry point, measured with python -X importtime
+
+fails (exit 1) when importing cc_resume.cmd takes longer than the budget or pulls in a module which
+belongs to the render path only.
+
+python -m benchmarks.bench_startup [--budget-ms 50] [--repeat 5]
+"""
+import argparse
+import re
+import subprocess
+import sys
+
+# only the render path may import these
+HEAVY_MODULES = ('reportlab', 'oslo_config', 'yaml', 'cc_resume.config', 'cc_resume.main')
+LINE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)')
+
+
+def import_times(module):
+    """[(module, self us, cumulative us, depth)] of one fresh interpreter importing module"""
+    proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                          capture_output=True, text=True, check=True)
+    times = []
+    for line in proc.stderr.splitlines():
+        match = LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            times.append((name, int(self_us), int(cumulative_us), (len(indent) - 1) // 2))
+    return times
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--module', default='cc_resume.cmd')
+    parser.add_argument('--budget-ms', type=float, default=50)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--top', type=int, default=10)
+    args = parser.parse_args()
+
+    runs = [import_times(args.module) for _ in range(args.repeat)]
+    totals = sorted(dict((name, cumulative) for name, _, cumulative, _ in run)[args.module] for run in runs)
+    median_ms = totals[len(totals) // 2] / 1000
+
+    last = runs[-1]
+    print(f'import {args.module}: median {median_ms:.1f} ms over {args.repeat} runs, budget {args.budget_ms} ms')
+    print('top modules by self time:')
+    for name, self_us, cumulative_us, depth in sorted(last, key=lambda t: -t[1])[:args.top]:
+        print(f'  {self_us / 1000:8.2f} ms  {cumulative_us / 1000:8.2f} ms  {name}')
+
+    heavy = sorted({name for name, *_ in last if name.split('.')[0] in HEAVY_MODULES or name in HEAVY_MODULES})
+    failed = False
+    if heavy:
+        print(f'FAIL: render path modules imported at startup: {", ".join(heavy)}')
+        failed = True
+    if median_ms > args.budget_ms:
+        print(f'FAIL: {median_ms:.1f} ms is over the budget of {args.budget_ms} ms')
+        failed = True
+    if failed:
+        sys.exit(1)
+    print('OK')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,112 @@
+"""synthetic resumes with the schema of cc_resume/resumes/author.yaml
+
+python -m benchmarks.generate [--entries 4] [--descriptions 2] [--description-chars 120] [--cjk-ratio 0.5]
+                              [--seed 0] [--records 1] [--format yaml] [-o resume.yaml]
+
+with --records N the output is a stream of N resumes (seeds seed..seed+N-1) for cc-resume bulk, a multi
+document yaml or with --format jsonl one json object per line
+"""
+import argparse
+import random
+import sys
+
+CJK_CHARS = ('提供一个界面工具制作了离线部署包能够在上完成安装或配置实现对的快速运行后台配合使用将粘贴中图片自动转化为'
+             '链接减少笔记文件大小通过库结合简历数据生成智能一页本就是此项目负责设计开发测试维护性能优化系统服务平台'
+             '用户团队管理分析需求架构模块接口稳定可靠高效提升降低成本方案落地')
+LATIN_WORDS = ('python', 'reportlab', 'yaml', 'linux', 'docker', 'kubernetes', 'api', 'flask', 'redis', 'mysql',
+               'deploy', 'performance', 'cache', 'service', 'pipeline', 'monitor', 'gateway', 'storage', 'pve', 'tui')
+CITIES = ('江苏南京', '上海', '北京', 'Hangzhou', 'Shenzhen', 'Remote')
+
+
+def text(rng, length, cjk_ratio):
+    """about length characters, cjk_ratio of them cjk, the rest latin words"""
+    parts, size = [], 0
+    while size < length:
+        if rng.random() < cjk_ratio:
+            part = ''.join(rng.choice(CJK_CHARS) for _ in range(rng.randint(2, 6)))
+        else:
+            part = f' {rng.choice(LATIN_WORDS)} '
+        parts.append(part)
+        size += len(part)
+    return ''.join(parts).strip()[:length]
+
+
+def duration(rng):
+    start = rng.randint(2008, 2022)
+    return f'{start}.{rng.randint(1, 12):02d}-{rng.randint(start + 1, 2024)}.{rng.randint(1, 12):02d}'
+
+
+def link(name):
+    return f'<a href="https://github.com/example/{name}" color="blue">(GitHub)</a>'
+
+
+def generate_resume(entries=3, descriptions=2, description_chars=80, cjk_ratio=0.5, seed=0):
+    """a resume dict with entries items in every list section and descriptions lines per item"""
+    rng = random.Random(seed)
+
+    def short(length=8):
+        return text(rng, length, cjk_ratio)
+
+    def long():
+        return text(rng, description_chars, cjk_ratio)
+
+    return {
+        'author': {
+            'name': short(4),
+            'msg': short(24),
+            'contact': f'联系方式: 159xxxxxxxx，{link("profile")}',
+        },
+        'education': [
+            {'degree': short(16), 'university': short(10), 'location': rng.choice(CITIES), 'year': duration(rng)}
+            for _ in range(entries)
+        ],
+        'experience': [
+            {'name': short(6), 'company': short(12), 'location': rng.choice(CITIES), 'duration': duration(rng),
+             'description': [long() for _ in range(descriptions)]}
+            for _ in range(entries)
+        ],
+        'work_projects': [
+            {'role': short(10), 'name': f'project-{i}', 'location': rng.choice(CITIES), 'duration': duration(rng),
+             'description': [long() for _ in range(descriptions)]}
+            for i in range(entries)
+        ],
+        'open_projects': [
+            {'name': f'open-{i}', 'description': long(), 'link': link(f'open-{i}')}
+            for i in range(entries)
+        ],
+        'summary': [long() for _ in range(max(1, descriptions))],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--entries', type=int, default=3)
+    parser.add_argument('--descriptions', type=int, default=2)
+    parser.add_argument('--description-chars', type=int, default=80)
+    parser.add_argument('--cjk-ratio', type=float, default=0.5)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--records', type=int, default=1)
+    parser.add_argument('--format', choices=('yaml', 'jsonl'), default='yaml')
+    parser.add_argument('-o', '--output')
+    args = parser.parse_args()
+
+    import json
+    import yaml
+    f = open(args.output, 'w', encoding='utf-8') if args.output else sys.stdout
+    try:
+        for i in range(args.records):
+            data = generate_resume(args.entries, args.descriptions, args.description_chars, args.cjk_ratio,
+                                   args.seed + i)
+            if args.format == 'jsonl':
+                f.write(json.dumps(dict(data, id=f'r{args.seed + i}'), ensure_ascii=False) + '\n')
+                continue
+            if args.records > 1:
+                f.write('---\n')
+            f.write(yaml.safe_dump(data, allow_unicode=True, sort_keys=False))
+    finally:
+        if f is not sys.stdout:
+            f.close()
+
+
+if __name__ == '__main__':
+    main()
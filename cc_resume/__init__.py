@@ -8,3 +8,4 @@ class Author:
     name = 'cc'
     zh_name = 'B站UP主吵吵博士'
     gift_name = 'B站UP主吵吵博士的赠礼'
+    des = f'本工具完全免费, 由{zh_name}开发'
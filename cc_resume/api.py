@@ -0,0 +1,283 @@
+"""render a resume in process, no CONF, no yaml file and no pdf file
+
+    from cc_resume.api import render, RenderOptions
+    result = render(yaml.safe_load(content), RenderOptions(title_color='#1f6feb'))
+    result.pdf  # bytes of the one page pdf
+
+    # one pdf per variant, fonts, markup, section plans and fits are shared
+    results = render_variants(data, [{'name': 'zh'}, {'name': 'blue', 'title_color': 'blue'},
+                                     {'name': 'en', 'language': 'en'}])
+
+    # several fitted resumes in one pdf, one page each, the fonts are embedded once
+    pdf, page = render_merged([(data, result) for data, result in zip(datas, results)])
+
+render is re-entrant and may be called from several threads at once, FitError is raised when the
+resume does not fit one page within the options, markup.MarkupError before any layout when a text is
+not valid paragraph markup and glyphs.GlyphError when a text has characters the fonts do not cover
+"""
+import io
+import math
+import threading
+import dataclasses
+from concurrent.futures import ProcessPoolExecutor
+
+from reportlab.platypus import PageBreak
+
+from cc_resume import metrics, layout, glyphs
+from cc_resume.glyphs import GlyphError
+from cc_resume.markup import MarkupError, compile_resume
+from cc_resume.fit import FitEngine, FitError, FitResult, ParallelFitEngine, MIN_PADDING
+from cc_resume.main import CreatePdf, Fonts, LAYOUT_MODES
+
+__all__ = ['RenderOptions', 'RenderResult', 'FitError', 'MarkupError', 'GlyphError', 'render', 'render_variants',
+           'render_merged']
+
+
+@dataclasses.dataclass(frozen=True)
+class RenderOptions:
+    # same defaults as the cli options in cc_resume.config
+    font_size: float = 15
+    title_padding: float = 10
+    # font_size - 4 when not given
+    min_font_size: float = None
+    extra_leading: float = 1
+    # a fit which fills less of the page keeps searching for a bigger font size
+    fill_ratio: float = 0.8
+    # reportlab color name or #rrggbb
+    title_color: str = 'orange'
+    # where the parsed font metrics are cached, None parses the ttf files once per process
+    cache_dir: str = None
+    # 'table' builds one Table per section, 'stream' one per entry which scales to long resumes
+    layout_mode: str = 'table'
+    # font size of an earlier fit of the same resume, the search starts there
+    start_font_size: float = None
+    # measure the next fit candidates in this many processes, 0 or 1 searches in the calling thread,
+    # the result is the same either way
+    fit_workers: int = 0
+    # smallest pdf, font subsets without the ascii glyphs and every stream flate level 9, see pdfsize
+    compact: bool = False
+    # raise GlyphError before any layout when a text has characters without a glyph in the fonts
+    check_glyphs: bool = True
+
+    def __post_init__(self):
+        def positive(name, value):
+            if not isinstance(value, (int, float)) or not math.isfinite(value) or value <= 0:
+                raise ValueError(f'{name} must be a finite number > 0, not {value!r}')
+
+        positive('font_size', self.font_size)
+        positive('min_font_size', self.lowest_font_size)
+        if self.start_font_size is not None:
+            positive('start_font_size', self.start_font_size)
+        if self.lowest_font_size > self.font_size:
+            raise ValueError(f'min_font_size {self.lowest_font_size} is bigger than font_size {self.font_size}')
+        positive('title_padding', self.title_padding)
+        if self.title_padding < MIN_PADDING:
+            raise ValueError(f'title_padding must be >= {MIN_PADDING}, not {self.title_padding!r}')
+        if not isinstance(self.extra_leading, (int, float)) or not math.isfinite(self.extra_leading) \
+                or self.extra_leading < 0:
+            raise ValueError(f'extra_leading must be a finite number >= 0, not {self.extra_leading!r}')
+        if not isinstance(self.fill_ratio, (int, float)) or not 0 < self.fill_ratio <= 1:
+            raise ValueError(f'fill_ratio must be in (0, 1], not {self.fill_ratio!r}')
+        if self.layout_mode not in LAYOUT_MODES:
+            raise ValueError(f'layout_mode must be one of {", ".join(LAYOUT_MODES)}, not {self.layout_mode!r}')
+        if not isinstance(self.fit_workers, int) or self.fit_workers < 0:
+            raise ValueError(f'fit_workers must be an int >= 0, not {self.fit_workers!r}')
+
+    @property
+    def lowest_font_size(self):
+        """min_font_size, font_size - 4 when not given"""
+        return self.min_font_size if self.min_font_size is not None else self.font_size - 4
+
+
+class RenderResult(FitResult):
+    def __init__(self, pdf, page, fit):
+        super().__init__(fit.font_size, fit.padding, fit.leading, fit.layouts, fit.frame_y, fit.height,
+                         fit.content_height)
+        self.pdf = pdf
+        self.page = page
+        # metrics.Recorder.report() of this render
+        self.metrics = None
+        # the variant dict of render_variants
+        self.variant = None
+        # pdfsize.breakdown of a compact pdf, None otherwise
+        self.breakdown = None
+
+    @property
+    def fill(self):
+        """part of the frame height used by the content"""
+        return self.content_height / self.height
+
+    def __repr__(self):
+        return f'RenderResult(page={self.page}, font_size={self.font_size}, padding={self.padding}, ' \
+               f'leading={self.leading}, layouts={self.layouts}, bytes={len(self.pdf)})'
+
+
+_fit_pools = {}
+_fit_pools_lock = threading.Lock()
+
+
+def fit_pool(workers, cache_dir=None):
+    """process pool shared by every parallel fit with the same workers and cache_dir, fonts are registered
+    once per worker"""
+    key = workers, cache_dir
+    with _fit_pools_lock:
+        pool = _fit_pools.get(key)
+        if pool is None:
+            pool = _fit_pools[key] = ProcessPoolExecutor(max_workers=workers, initializer=Fonts,
+                                                         initargs=(cache_dir,))
+    return pool
+
+
+def shutdown_fit_pools():
+    """stop the fit_pool workers, a multiprocessing worker must call it before it exits, its exit waits
+    for every child process"""
+    with _fit_pools_lock:
+        pools = list(_fit_pools.values())
+        _fit_pools.clear()
+    for pool in pools:
+        pool.shutdown()
+
+
+def create_pdf(data, options, font_size, padding, leading, output=None):
+    pdf = CreatePdf(font_size, padding, extra_leading=leading - font_size, output_path=output, data=data,
+                    title_color=options.title_color, cache_dir=options.cache_dir, layout_mode=options.layout_mode,
+                    compact=options.compact)
+    pdf.add_data()
+    return pdf
+
+
+def measure_layout(data, options, font_size, padding, leading):
+    """one layout of the fit search, runs in a fit_pool worker"""
+    return create_pdf(data, options, font_size, padding, leading).measure()
+
+
+def render(data, options=None, on_layout=None, hooks=None):
+    """fit data (the parsed resume yaml) on one page, returns RenderResult with the pdf bytes
+
+    on_layout(font_size, padding, layout) is called after every layout of the fit search,
+    hooks are metrics.Hook which get the timers and counters of this render
+    """
+    with metrics.recording(hooks) as recorder:
+        result = _render(data, options or RenderOptions(), on_layout)
+        result.metrics = recorder.report()
+    return result
+
+
+def _render(data, options, on_layout):
+    # the markup of the section plans names the registered faces
+    Fonts(options.cache_dir)
+    sections = layout.section_keys(data)
+    if options.check_glyphs:
+        with metrics.phase('glyphs'):
+            glyphs.check_resume(data, sections, glyphs.coverage_index(options.cache_dir))
+    # every text is tokenized and every section plan compiled once here, the layouts of the fit search
+    # replay them
+    with metrics.phase('markup'):
+        compile_resume(data, sections)
+        layout.compile_plans(data)
+    limits = dict(max_font_size=options.font_size, min_font_size=options.lowest_font_size,
+                  max_padding=options.title_padding, extra_leading=options.extra_leading,
+                  fill_ratio=options.fill_ratio)
+    if options.fit_workers > 1:
+        pool = fit_pool(options.fit_workers, options.cache_dir)
+
+        def submit(font_size, padding, leading):
+            return pool.submit(measure_layout, data, options, font_size, padding, leading)
+
+        engine = ParallelFitEngine(submit, workers=options.fit_workers, on_layout=on_layout, **limits)
+    else:
+        def measure(font_size, padding, leading):
+            layout = measure_layout(data, options, font_size, padding, leading)
+            if on_layout:
+                on_layout(font_size, padding, layout)
+            return layout
+
+        engine = FitEngine(measure, **limits)
+    with metrics.phase('fit'):
+        fit = engine.fit(start_font_size=options.start_font_size)
+    if options.fit_workers > 1:
+        metrics.count('speculative_layouts', engine.speculative)
+    return build(data, options, fit)
+
+
+def build(data, options, fit):
+    """RenderResult of the pdf at the font size, padding and leading of fit"""
+    output = io.BytesIO()
+    pdf = create_pdf(data, options, fit.font_size, fit.padding, fit.leading, output)
+    pdf.build(verbose=False)
+    metrics.count('pdf_bytes', output.tell())
+    result = RenderResult(output.getvalue(), pdf.doc.page, fit)
+    result.breakdown = pdf.breakdown
+    return result
+
+
+def render_merged(resumes, options=None):
+    """one pdf of every (data, fit) in resumes, each starts on a new page at the font size, padding and
+    leading of its fit (a RenderResult or FitResult), returns (pdf bytes, pages)
+
+    the pdf is a single document so every glyph is embedded once for all resumes instead of once per file
+    """
+    options = options or RenderOptions()
+    output = io.BytesIO()
+    merged = None
+    for data, fit in resumes:
+        pdf = create_pdf(data, options, fit.font_size, fit.padding, fit.leading, output if merged is None else None)
+        if merged is None:
+            merged = pdf
+        else:
+            merged.build_elements += [PageBreak()] + pdf.build_elements
+    if merged is None:
+        raise ValueError('no resume to merge')
+    merged.build(verbose=False)
+    metrics.count('pdf_bytes', output.tell())
+    return output.getvalue(), merged.doc.page
+
+
+# keys of a variant besides the RenderOptions fields
+VARIANT_KEYS = ('name', 'language', 'titles')
+
+
+def apply_variant(data, options, variant):
+    """(data, options) of one variant, data shares everything with the given data but the layout"""
+    unknown = set(variant) - set(VARIANT_KEYS) - {field.name for field in dataclasses.fields(RenderOptions)}
+    if unknown:
+        raise ValueError(f'unknown variant keys {", ".join(sorted(unknown))}')
+    overrides = {name: value for name, value in variant.items() if name not in VARIANT_KEYS}
+    options = dataclasses.replace(options, **overrides)
+    if variant.get('language') or variant.get('titles'):
+        sections = layout.localize(layout.resume_layout(data), variant.get('language'), variant.get('titles'))
+        data = dict(data, layout=sections)
+    return data, options
+
+
+def render_variants(data, variants, options=None, hooks=None):
+    """render data once per variant, returns [RenderResult] in the order of variants
+
+    a variant is a dict of RenderOptions fields to override plus name, language (see layout.LANGUAGES) and
+    titles ({section key: title}). every result is the one render would give for the variant, variants which
+    differ only by title_color share one fit search and skip layout. fonts, compiled markup and section
+    plans are shared by all of them.
+    """
+    options = options or RenderOptions()
+    # {options and layout but title_color: FitResult}
+    fits = {}
+    results = []
+    for variant in variants:
+        variant_data, variant_options = apply_variant(data, options, variant)
+        geometry = (dataclasses.replace(variant_options, title_color=None), variant.get('language'),
+                    tuple(sorted((variant.get('titles') or {}).items())))
+        with metrics.recording(hooks) as recorder:
+            fit = fits.get(geometry)
+            if fit is not None:
+                metrics.count('variant_fits_reused')
+                result = build(variant_data, variant_options, fit)
+                # the pdf is new, the layouts were done for an earlier variant
+                result.layouts = 0
+            else:
+                # a fit search started from another variant's font size may stop on a different filled size,
+                # every other geometry searches as a standalone render does
+                result = fits[geometry] = _render(variant_data, variant_options, None)
+            result.metrics = recorder.report()
+        result.variant = variant
+        results.append(result)
+    return results
@@ -0,0 +1,59 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from cc_resume import pdfsize
+from cc_resume.config import CONF
+
+
+def init_worker(args, config_file_path):
+    # every worker parses the same cli args and config file as the parent, nothing is written back
+    CONF(args, default_config_files=[config_file_path])
+    # every core already renders a file, a parallel fit in each of them would only add processes
+    CONF.set_override('fit_workers', 0)
+    from cc_resume import main
+    # the registry is per process, the first registration decides where the font cache is read and written
+    main.Fonts(CONF.resume.config_dir)
+
+
+def render_file(yaml_path):
+    from cc_resume import main
+    start = time.perf_counter()
+    result = {'name': os.path.basename(yaml_path), 'ok': False, 'page': None, 'font_size': None,
+              'padding': None, 'layouts': None, 'breakdown': None, 'error': None}
+    try:
+        fit = main.fit_one_page_pdf(yaml_path, verbose=False)
+        result.update(ok=True, page=fit.page, font_size=fit.font_size, padding=fit.padding, leading=fit.leading,
+                      layouts=fit.layouts, yaml_path=yaml_path, output_path=fit.output_path,
+                      # compact mode only, an up to date pdf is not read back
+                      breakdown=getattr(fit, 'breakdown', None))
+    except Exception as e:
+        result['error'] = f'{e.__class__.__name__}: {e}'
+    result['seconds'] = time.perf_counter() - start
+    return result
+
+
+def render_batch(yaml_paths, args, config_file_path, workers=None):
+    """render every yaml in a process pool, yields one result dict per file as soon as it is done"""
+    with ProcessPoolExecutor(max_workers=workers or None, initializer=init_worker,
+                             initargs=(args, config_file_path)) as executor:
+        futures = [executor.submit(render_file, path) for path in yaml_paths]
+        for future in as_completed(futures):
+            yield future.result()
+
+
+def print_summary(results, seconds):
+    results = sorted(results, key=lambda r: r['name'])
+    width = max([len(r['name']) for r in results] + [4])
+    print(f"{'name':<{width}}  {'status':<6}  {'page':>4}  {'font':>6}  {'pad':>4}  {'layouts':>7}  {'seconds':>7}")
+    for r in results:
+        if r['ok']:
+            print(f"{r['name']:<{width}}  {'ok':<6}  {r['page']:>4}  {r['font_size']:>6}  {r['padding']:>4}  "
+                  f"{r['layouts']:>7}  {r['seconds']:>7.2f}")
+            if r['breakdown']:
+                print(f"{'':<{width}}  pdf bytes {pdfsize.format_breakdown(r['breakdown'])}")
+        else:
+            print(f"{r['name']:<{width}}  {'failed':<6}  {'':>4}  {'':>6}  {'':>4}  {'':>7}  {r['seconds']:>7.2f}  "
+                  f"{r['error']}")
+    failed = len([r for r in results if not r['ok']])
+    print(f'{len(results)} resumes, {len(results) - failed} ok, {failed} failed, {seconds:.2f}s')
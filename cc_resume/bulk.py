@@ -0,0 +1,193 @@
+"""cc-resume bulk: render every resume of one multi document yaml or jsonl file
+
+    cc-resume bulk --bulk_input profiles.jsonl --bulk_output profiles.zip
+
+records are parsed one at a time while the file is read and at most 2 * workers of them are waiting or
+rendering at any moment, every pdf goes to the output as soon as it is done, so memory does not grow with
+the number of records. the output is a directory, or a .zip, .tar, .tar.gz, .tgz archive which is
+renamed into place when every record is written.
+
+a record may carry an id, its pdf is named <number>-<id>.pdf, otherwise <number>.pdf, number counts the
+records from 1
+"""
+import io
+import os
+import re
+import json
+import time
+import tarfile
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+from cc_resume import utils
+
+JSONL_SUFFIXES = ('.jsonl', '.ndjson')
+TAR_MODES = {'.tar': 'w', '.tar.gz': 'w:gz', '.tgz': 'w:gz'}
+
+
+def iter_jsonl(f):
+    for line_number, line in enumerate(f, 1):
+        if not line.strip():
+            continue
+        try:
+            yield json.loads(line), None
+        except ValueError as e:
+            yield None, f'line {line_number}: {e}'
+
+
+def iter_yaml(f):
+    documents = utils.load_yaml_all(f)
+    while True:
+        try:
+            data = next(documents)
+        except StopIteration:
+            return
+        except Exception as e:
+            # the parser can not find the start of the next document after a syntax error
+            yield None, f'{e.__class__.__name__}: {e}, the rest of the stream is skipped'
+            return
+        # empty documents, e.g. a trailing ---
+        if data is not None:
+            yield data, None
+
+
+def iter_records(input_path):
+    """yields (number, data, error) per record, data is None when the record can not be parsed"""
+    with open(input_path, 'r', encoding='utf-8') as f:
+        records = iter_jsonl(f) if input_path.lower().endswith(JSONL_SUFFIXES) else iter_yaml(f)
+        for number, (data, error) in enumerate(records, 1):
+            if error is None and not isinstance(data, dict):
+                data, error = None, f'record is a {type(data).__name__}, not a mapping'
+            yield number, data, error
+
+
+def record_name(number, data):
+    record_id = data.get('id') if data else None
+    if record_id is None:
+        return f'{number:06d}.pdf'
+    record_id = re.sub(r'[^\w.-]+', '_', str(record_id))[:64]
+    return f'{number:06d}-{record_id}.pdf'
+
+
+class DirectoryOutput:
+    def __init__(self, path):
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+
+    def write(self, name, pdf):
+        from cc_resume.main import write_pdf
+        write_pdf(os.path.join(self.path, name), pdf)
+
+    def close(self):
+        pass
+
+    def abort(self):
+        pass
+
+
+class ZipOutput:
+    def __init__(self, path):
+        self.path = path
+        self.tmp_path = f'{path}.{os.getpid()}.tmp'
+        self.archive = zipfile.ZipFile(self.tmp_path, 'w', zipfile.ZIP_DEFLATED)
+
+    def write(self, name, pdf):
+        self.archive.writestr(zipfile.ZipInfo(name, time.localtime()[:6]), pdf, zipfile.ZIP_DEFLATED)
+
+    def close(self):
+        self.archive.close()
+        os.replace(self.tmp_path, self.path)
+
+    def abort(self):
+        self.archive.close()
+        os.remove(self.tmp_path)
+
+
+class TarOutput(ZipOutput):
+    def __init__(self, path, mode):
+        self.path = path
+        self.tmp_path = f'{path}.{os.getpid()}.tmp'
+        self.archive = tarfile.open(self.tmp_path, mode)
+
+    def write(self, name, pdf):
+        info = tarfile.TarInfo(name)
+        info.size = len(pdf)
+        info.mtime = time.time()
+        self.archive.addfile(info, io.BytesIO(pdf))
+        # TarFile keeps every TarInfo for getmembers(), nothing reads them back while writing
+        self.archive.members.clear()
+
+
+def open_output(path):
+    """DirectoryOutput, ZipOutput or TarOutput by the suffix of path"""
+    lower = path.lower()
+    if lower.endswith('.zip'):
+        return ZipOutput(path)
+    for suffix, mode in TAR_MODES.items():
+        if lower.endswith(suffix):
+            return TarOutput(path, mode)
+    return DirectoryOutput(path)
+
+
+def init_worker(cache_dir):
+    from cc_resume import main
+    main.Fonts(cache_dir)
+
+
+def render_record(name, data, options):
+    """runs in a worker, returns (pdf bytes or None, result dict)"""
+    from cc_resume import api, main, layout
+    start = time.perf_counter()
+    result = {'name': name, 'ok': False, 'page': None, 'font_size': None, 'padding': None, 'layouts': None,
+              'breakdown': None, 'error': None}
+    pdf = None
+    try:
+        fit = api.render(data, options)
+        pdf = fit.pdf
+        result.update(ok=True, page=fit.page, font_size=fit.font_size, padding=fit.padding, layouts=fit.layouts,
+                      breakdown=fit.breakdown)
+    except Exception as e:
+        result['error'] = f'{e.__class__.__name__}: {e}'
+    finally:
+        # every record is a different resume, cached sections would never be hit again
+        main.section_cache().clear()
+        layout.clear_plans()
+    result['seconds'] = time.perf_counter() - start
+    return pdf, result
+
+
+def render_bulk(input_path, output, options, workers=None):
+    """render every record of input_path into output (see open_output), yields one result dict per record
+    as soon as its pdf is written, in the order the records finish"""
+    workers = workers or os.cpu_count()
+    # records parsed ahead of the workers, the only ones held in memory
+    window = workers * 2
+    executor = ProcessPoolExecutor(max_workers=workers, initializer=init_worker, initargs=(options.cache_dir,))
+    pending = set()
+
+    def finish(futures):
+        for future in futures:
+            pdf, result = future.result()
+            if pdf is not None:
+                output.write(result['name'], pdf)
+            yield result
+
+    try:
+        for number, data, error in iter_records(input_path):
+            name = record_name(number, data)
+            if error is not None:
+                yield {'name': name, 'ok': False, 'error': error, 'seconds': 0}
+                continue
+            pending.add(executor.submit(render_record, name, data, options))
+            if len(pending) >= window:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                yield from finish(done)
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            yield from finish(done)
+    except BaseException:
+        executor.shutdown(cancel_futures=True)
+        output.abort()
+        raise
+    executor.shutdown()
+    output.close()
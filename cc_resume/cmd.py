@@ -1,31 +1,48 @@
 import os
-import shutil
+import sys
+import time
+import fnmatch
 
 from cc_resume import utils
-from cc_resume import CURRENT_DIR
-from cc_resume.config import CONF
+from cc_resume import CURRENT_DIR, Author
+
+# cc_resume.config (oslo.config) and cc_resume.main (reportlab) are imported only when something is rendered,
+# listing the yaml and answering the prompt stays cheap, see benchmarks/bench_startup.py
+
+
+# cc-resume <command> [options], without a command the yaml is chosen interactively
+COMMANDS = ('watch', 'serve', 'bulk')
 
 
 class Cmd:
 
     def __init__(self):
         self.config_dir = utils.mkdir_config('resume')
-        print(f"=== {CONF.author_des} ===")
+        self.config_file_path = os.path.join(self.config_dir, '.resume.conf')
+        print(f"=== {self.author_des()} ===")
         print(f"find resume yaml in {self.config_dir}")
 
-        self.config_file_path = os.path.join(self.config_dir, '.resume.conf')
         self.depend()
         self.data_resumes = self.get_resume_yaml()
 
+    def author_des(self):
+        # same value as CONF.author_des without loading oslo.config
+        flag, content = utils.ini_get_config(self.config_file_path, 'DEFAULT', 'author_des', check_file_exist=False)
+        return content if flag == 0 else Author.des
+
     def get_resume_yaml(self):
         yaml_files = [f for f in os.listdir(self.config_dir) if f.endswith('.yaml')]
         return yaml_files
 
     def depend(self):
         project_resumes_dir = os.path.join(CURRENT_DIR, 'resumes')
-        shutil.copytree(project_resumes_dir, self.config_dir, dirs_exist_ok=True)
-        utils.crudini_set_config(
-            self.config_file_path, 'resume', 'config_dir', self.config_dir, check_file_exist=False)
+        manifest_path = os.path.join(self.config_dir, '.bundled.json')
+        for rel_path in utils.sync_tree(project_resumes_dir, self.config_dir, manifest_path):
+            print(f'copy {rel_path} to {self.config_dir}')
+        flag, config_dir = utils.ini_get_config(self.config_file_path, 'resume', 'config_dir', check_file_exist=False)
+        if flag != 0 or config_dir != self.config_dir:
+            utils.ini_set_config(self.config_file_path, 'resume', {'config_dir': self.config_dir},
+                                 check_file_exist=False)
 
     def prompts(self):
         print('please choose one yaml:')
@@ -33,7 +50,7 @@ class Cmd:
             print(f'{i+1}: {name}')
         print(f'q: exit')
 
-    def run(self):
+    def run(self, args=None):
         length = len(self.data_resumes)
         while True:
             self.prompts()
@@ -45,14 +62,104 @@ class Cmd:
             if number.isdigit() and int(number) in range(1, length+1):
                 yaml_name = self.data_resumes[int(number) - 1]
                 print(f'now generate pdf for {yaml_name}')
-                utils.crudini_set_config(self.config_file_path, 'resume', 'name', yaml_name)
+                utils.ini_set_config(self.config_file_path, 'resume', {'name': yaml_name})
                 from cc_resume import main
-                main.main()
+                main.main(args)
                 break
             else:
                 print(f'error input! input must be in [0-{length - 1}]!')
                 continue
 
+    def batch(self, args):
+        from cc_resume.config import CONF
+        pattern = CONF.glob or '*.yaml'
+        yaml_names = sorted(fnmatch.filter(self.data_resumes, pattern))
+        if not yaml_names:
+            print(f'no yaml matches {pattern}')
+            return
+        print(f'now generate pdf for {len(yaml_names)} yaml with {CONF.workers or os.cpu_count()} workers')
+        from cc_resume import batch
+        start = time.perf_counter()
+        yaml_paths = [os.path.join(self.config_dir, name) for name in yaml_names]
+        results = []
+        for result in batch.render_batch(yaml_paths, args, self.config_file_path, CONF.workers):
+            status = f"page={result['page']}" if result['ok'] else f"failed, {result['error']}"
+            print(f"{result['name']}: {status}, {result['seconds']:.2f}s")
+            results.append(result)
+        batch.print_summary(results, time.perf_counter() - start)
+        rendered = [result for result in results if result['ok']]
+        if CONF.merged_pdf and rendered:
+            from cc_resume import main
+            merged_path = os.path.join(self.config_dir, CONF.merged_pdf)
+            page = main.write_merged_pdf(rendered, merged_path, self.config_dir)
+            print(f'merged pdf page is {page}, path is {merged_path}')
+        if not all(result['ok'] for result in results):
+            exit(1)
+
+    def bulk(self):
+        from cc_resume.config import CONF
+        if not CONF.bulk_input:
+            print('cc-resume bulk needs --bulk_input')
+            exit(1)
+        import dataclasses
+        from cc_resume import bulk, main, pdfsize
+        output_path = CONF.bulk_output or os.path.splitext(CONF.bulk_input)[0]
+        # every core already renders a record
+        options = dataclasses.replace(main.render_options(cache_dir=self.config_dir), fit_workers=0)
+        workers = CONF.workers or os.cpu_count()
+        print(f'now generate pdf for every resume in {CONF.bulk_input} with {workers} workers to {output_path}')
+        start = time.perf_counter()
+        total = failed = 0
+        for result in bulk.render_bulk(CONF.bulk_input, bulk.open_output(output_path), options, workers):
+            total += 1
+            if result['ok']:
+                sizes = f", pdf bytes {pdfsize.format_breakdown(result['breakdown'])}" if result['breakdown'] else ''
+                print(f"{result['name']}: page={result['page']}, font_size={result['font_size']}, "
+                      f"{result['seconds']:.2f}s{sizes}")
+            else:
+                failed += 1
+                print(f"{result['name']}: failed, {result['error']}")
+        seconds = time.perf_counter() - start
+        print(f'{total} resumes, {total - failed} ok, {failed} failed, {seconds:.2f}s, '
+              f'{total / seconds:.1f} resumes/s, written to {output_path}')
+        if failed:
+            exit(1)
+
+    def watch(self):
+        from cc_resume.config import CONF
+        from cc_resume import watch
+        try:
+            watch.Watch(self.config_dir, CONF.watch_interval).run()
+        except KeyboardInterrupt:
+            pass
+
+    def serve(self):
+        from cc_resume.config import CONF
+        from cc_resume import main, serve
+        # the server already renders in --workers processes
+        CONF.set_override('fit_workers', 0)
+        serve.RenderServer(CONF.serve_host, CONF.serve_port, CONF.workers, CONF.serve_queue,
+                           cache_dir=self.config_dir,
+                           options=main.render_options(cache_dir=self.config_dir)).run()
+
 
 def main():
-    Cmd().run()
+    args = sys.argv[1:]
+    command = args.pop(0) if args and args[0] in COMMANDS else None
+    cmd = Cmd()
+    if args or command:
+        from cc_resume.config import CONF
+        CONF(args, default_config_files=[cmd.config_file_path])
+        if command == 'watch':
+            cmd.watch()
+            return
+        if command == 'serve':
+            cmd.serve()
+            return
+        if command == 'bulk':
+            cmd.bulk()
+            return
+        if CONF.all or CONF.glob:
+            cmd.batch(args)
+            return
+    cmd.run(args)
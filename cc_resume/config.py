@@ -3,8 +3,6 @@ import socket
 import logging
 
 from oslo_config import cfg
-from reportlab.lib import colors
-
 from cc_resume import Author
 
 CONF = cfg.CONF
@@ -13,13 +11,42 @@ AIO_CONF_PATH = f'/etc/{Author.name}/resume.conf'
 default_opts = [
     cfg.IntOpt('font_size', default=15, help="默认字体大小"),
     cfg.IntOpt('title_padding', default=10, help="title_padding"),
-    cfg.StrOpt('author_des', default=f'本工具完全免费, 由{Author.zh_name}开发', help="tui title"),
+    cfg.StrOpt('author_des', default=Author.des, help="tui title"),
+    cfg.BoolOpt('all', default=False, help="render every yaml in config_dir without prompt"),
+    cfg.StrOpt('glob', help="render every yaml in config_dir matching this glob without prompt"),
+    cfg.BoolOpt('force', default=False, help="rebuild even if yaml, fonts and options are not changed"),
+    cfg.StrOpt('layout_mode', default='table', choices=('table', 'stream'),
+               help="table: one table per section, stream: one table per entry, faster for very long resumes"),
+    cfg.BoolOpt('profile', default=False,
+                help="write phase timings and counters of every render to <yaml>.profile.json"),
+    cfg.BoolOpt('profile_cprofile', default=False, help="write a cProfile dump of every render to <yaml>.prof"),
+    cfg.FloatOpt('watch_interval', default=0.5, help="cc-resume watch polling interval when inotify is missing"),
+    cfg.IntOpt('workers', default=0, help="batch, bulk and serve render processes, 0 means cpu count"),
+    cfg.IntOpt('fit_workers', default=0, min=0,
+               help="measure fit candidates in this many processes, the result is the same as without"),
+    cfg.StrOpt('variants',
+               help="yaml list of variants (title_color, language, titles... and name), one <yaml>-<name>.pdf each"),
+    cfg.BoolOpt('compact', default=False,
+                help="smallest pdf: font subsets without the ascii glyphs, every stream flate level 9, prints the "
+                     "bytes of fonts, content and the rest"),
+    cfg.BoolOpt('check_glyphs', default=True,
+                help="fail before layout when a text has characters the fonts do not cover, with the field paths"),
+    cfg.StrOpt('merged_pdf',
+               help="--all/--glob also writes every resume into this one pdf, the fonts are embedded once"),
+    cfg.StrOpt('bulk_input', help="cc-resume bulk input, a multi document yaml or a .jsonl file of resumes"),
+    cfg.StrOpt('bulk_output',
+               help="cc-resume bulk output, a directory or a .zip/.tar/.tar.gz archive, default <bulk_input> without "
+                    "suffix"),
+    cfg.StrOpt('serve_host', default='127.0.0.1', help="cc-resume serve listen address"),
+    cfg.PortOpt('serve_port', default=8000, help="cc-resume serve listen port"),
+    cfg.IntOpt('serve_queue', default=16, min=0,
+               help="renders waiting for a worker before cc-resume serve answers 503"),
 ]
 
 resume_opts = [
     cfg.StrOpt('name', help="name"),
     cfg.StrOpt('config_dir', help="config_dir"),
-    cfg.StrOpt('title_color', default=colors.orange, help="title_color"),
+    cfg.StrOpt('title_color', default='orange', help="title_color, reportlab color name or #rrggbb"),
 ]
 
 CONF.register_cli_opts(default_opts)
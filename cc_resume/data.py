@@ -0,0 +1,91 @@
+import os
+import pickle
+import hashlib
+import logging
+import threading
+
+from cc_resume import utils, metrics
+
+LOG = logging.getLogger(__name__)
+
+# bump when the pickled layout changes
+CACHE_VERSION = 1
+
+
+def cache_path(cache_dir, yaml_path):
+    return os.path.join(cache_dir, f'.{os.path.basename(yaml_path)}.cache')
+
+
+class ResumeLoader:
+    """parse every resume yaml once per process, the parsed data is also pickled to cache_dir
+
+    the cache is keyed by (size, mtime, sha256) of the yaml, returned data is shared so treat it as read-only
+    """
+
+    def __init__(self):
+        self.entries = {}
+        self._lock = threading.Lock()
+
+    def load_disk_cache(self, path):
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, 'rb') as f:
+                entry = pickle.load(f)
+        except Exception as e:
+            LOG.warning(f'ignore broken resume cache {path}, err={e}')
+            return None
+        if entry.get('version') != CACHE_VERSION:
+            return None
+        return entry
+
+    def save_disk_cache(self, path, entry):
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        try:
+            with open(tmp_path, 'wb') as f:
+                pickle.dump(entry, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            LOG.warning(f'save resume cache {path} failed, err={e}')
+
+    def load(self, yaml_path, cache_dir=None):
+        yaml_path = os.path.abspath(yaml_path)
+        stat = os.stat(yaml_path)
+        fingerprint = stat.st_size, stat.st_mtime_ns
+        entry = self.entries.get(yaml_path)
+        if entry and entry['fingerprint'] == fingerprint:
+            return entry['data']
+
+        with self._lock:
+            with open(yaml_path, 'rb') as f:
+                content = f.read()
+            digest = hashlib.sha256(content).hexdigest()
+            disk_path = cache_path(cache_dir, yaml_path) if cache_dir else None
+            if not entry or entry['sha256'] != digest:
+                entry = self.load_disk_cache(disk_path) if disk_path else None
+            if entry and entry['sha256'] == digest:
+                entry['fingerprint'] = fingerprint
+            else:
+                entry = {'version': CACHE_VERSION, 'fingerprint': fingerprint, 'sha256': digest,
+                         'data': utils.load_yaml(content)}
+                if disk_path:
+                    self.save_disk_cache(disk_path, entry)
+            self.entries[yaml_path] = entry
+        return entry['data']
+
+    def sha256(self, yaml_path, cache_dir=None):
+        self.load(yaml_path, cache_dir)
+        return self.entries[os.path.abspath(yaml_path)]['sha256']
+
+
+LOADER = ResumeLoader()
+
+
+def load_resume(yaml_path, cache_dir=None):
+    with metrics.phase('yaml'):
+        return LOADER.load(yaml_path, cache_dir)
+
+
+def resume_sha256(yaml_path, cache_dir=None):
+    with metrics.phase('yaml'):
+        return LOADER.sha256(yaml_path, cache_dir)
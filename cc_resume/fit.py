@@ -0,0 +1,246 @@
+import math
+
+from reportlab.platypus.frames import _FUZZ
+
+# title padding the search never goes below
+MIN_PADDING = 1
+
+
+class FitError(Exception):
+    pass
+
+
+class FitResult:
+    def __init__(self, font_size, padding, leading, layouts, frame_y, height, content_height):
+        self.font_size = font_size
+        self.padding = padding
+        self.leading = leading
+        self.layouts = layouts
+        self.frame_y = frame_y
+        self.height = height
+        self.content_height = content_height
+        # a fit is one page by definition
+        self.page = 1
+        self.output_path = None
+        # True when the pdf of an earlier build was reused without any layout
+        self.up_to_date = False
+
+    def __repr__(self):
+        return f'FitResult(font_size={self.font_size}, padding={self.padding}, leading={self.leading}, ' \
+               f'layouts={self.layouts}, frame_y={self.frame_y})'
+
+
+class FitEngine:
+    """find the biggest font size and title padding which keep the resume on one page
+
+    measure(font_size, padding, leading) must return a main.Layout. total height is linear in padding
+    (every padded row adds the same amount), so one layout per font size is enough to solve the padding,
+    font size itself is bisected between min_font_size and max_font_size.
+    """
+
+    def __init__(self, measure, max_font_size, min_font_size, max_padding, min_padding=MIN_PADDING, extra_leading=1,
+                 fill_ratio=0.8, font_step=0.25, padding_step=1):
+        self.measure = measure
+        self.max_font_size = max_font_size
+        self.min_font_size = min_font_size
+        self.max_padding = max_padding
+        self.min_padding = min_padding
+        self.extra_leading = extra_leading
+        self.fill_ratio = fill_ratio
+        self.font_step = font_step
+        self.padding_step = padding_step
+        self.layouts = 0
+
+    def _round_font_size(self, font_size):
+        return math.floor(font_size / self.font_step) * self.font_step
+
+    def solve_padding(self, layout, measured_padding):
+        """largest padding in [min_padding, max_padding] keeping the content on one page, None if none does"""
+        free = layout.frame_top - layout.frame_bottom + _FUZZ - layout.content_height
+        if not layout.padding_rows:
+            return self.max_padding if free >= 0 else None
+        padding = measured_padding + free / layout.padding_rows
+        padding = min(self.max_padding, math.floor(padding / self.padding_step) * self.padding_step)
+        if padding < self.min_padding:
+            return None
+        return padding
+
+    def prefetch(self, font_sizes):
+        """font sizes the search may try next, most likely first, see ParallelFitEngine"""
+
+    @property
+    def prefetches(self):
+        """False for the sequential search, the candidate lists for prefetch are not built then"""
+        return type(self).prefetch is not FitEngine.prefetch
+
+    def bisect_candidates(self, low, high, best=None):
+        """every font size bisect(low, high) may try, breadth first, so the next few levels come first"""
+        candidates, intervals = [], [(low, high)]
+        while intervals:
+            low, high = intervals.pop(0)
+            if high - low <= self.font_step:
+                continue
+            font_size = self._round_font_size((low + high) / 2)
+            if font_size <= low:
+                continue
+            candidates.append(font_size)
+            intervals.extend([(low, font_size), (font_size, high)])
+        if best is None:
+            candidates.append(self.min_font_size)
+        return candidates
+
+    def expand_candidates(self, start):
+        """the font sizes expand(start) tries before it bisects, upward and downward"""
+        candidates, step, up, down = [start], self.font_step, start, start
+        while up < self.max_font_size or down > self.min_font_size:
+            if up < self.max_font_size:
+                up = min(self.max_font_size, up + step)
+                candidates.append(up)
+            if down > self.min_font_size:
+                down = max(self.min_font_size, down - step)
+                candidates.append(down)
+            step *= 2
+        return candidates
+
+    def try_font_size(self, font_size):
+        """one layout: returns FitResult for the best padding of font_size, or None if it never fits"""
+        leading = font_size + self.extra_leading
+        layout = self.measure(font_size, self.max_padding, leading)
+        self.layouts += 1
+        padding = self.solve_padding(layout, self.max_padding)
+        if padding is None:
+            return None
+        content_height = layout.content_height + layout.padding_rows * (padding - self.max_padding)
+        return FitResult(font_size, padding, leading, self.layouts, layout.frame_top - content_height,
+                         layout.height, content_height)
+
+    def is_filled(self, result):
+        return result.frame_y < result.height * (1 - self.fill_ratio)
+
+    def error(self):
+        return FitError(f'can not fit one page with font_size>={self.min_font_size}, '
+                        f'padding>={self.min_padding}, layouts={self.layouts}')
+
+    def bisect(self, low, high, best=None):
+        """bisect font size in (low, high), high never fits, low fits when best is given"""
+        while high - low > self.font_step:
+            if self.prefetches:
+                self.prefetch(self.bisect_candidates(low, high, best))
+            font_size = self._round_font_size((low + high) / 2)
+            if font_size <= low:
+                break
+            result = self.try_font_size(font_size)
+            if result is None:
+                high = font_size
+                continue
+            best, low = result, font_size
+            if self.is_filled(result):
+                return result
+        if best is None:
+            best = self.try_font_size(self.min_font_size)
+        if best is None:
+            raise self.error()
+        best.layouts = self.layouts
+        return best
+
+    def expand(self, start):
+        """search outward from start, doubling the step, until the fitting boundary is bracketed"""
+        if self.prefetches:
+            self.prefetch(self.expand_candidates(start))
+        best = self.try_font_size(start)
+        if best is not None and (self.is_filled(best) or start >= self.max_font_size):
+            return best
+        step = self.font_step
+        if best is not None:
+            # fits but too empty, go up
+            low = start
+            while True:
+                font_size = min(self.max_font_size, low + step)
+                result = self.try_font_size(font_size)
+                if result is None:
+                    return self.bisect(low, font_size, best)
+                best, low = result, font_size
+                if self.is_filled(result) or font_size >= self.max_font_size:
+                    return result
+                step *= 2
+        high = start
+        while high > self.min_font_size:
+            font_size = max(self.min_font_size, high - step)
+            result = self.try_font_size(font_size)
+            if result is not None:
+                if self.is_filled(result):
+                    return result
+                return self.bisect(font_size, high, result)
+            high = font_size
+            step *= 2
+        raise self.error()
+
+    def fit(self, start_font_size=None):
+        """start_font_size is the last winning font size, the search expands outward from it"""
+        self.layouts = 0
+        if start_font_size is not None:
+            start_font_size = self._round_font_size(start_font_size)
+            if self.min_font_size <= start_font_size < self.max_font_size:
+                return self.expand(start_font_size)
+        if self.prefetches:
+            self.prefetch([self.max_font_size] + self.bisect_candidates(self.min_font_size, self.max_font_size))
+        best = self.try_font_size(self.max_font_size)
+        if best is not None:
+            return best
+        return self.bisect(self.min_font_size, self.max_font_size)
+
+
+class ParallelFitEngine(FitEngine):
+    """FitEngine which measures the candidates of the next search steps in parallel
+
+    submit(font_size, padding, leading) must return a concurrent.futures.Future of the main.Layout. the
+    search itself is the sequential one, it only finds most layouts already done, so the result (layouts
+    included) is identical to FitEngine. candidates off the taken path are cancelled when not started yet.
+    """
+
+    def __init__(self, submit, max_font_size, min_font_size, max_padding, workers=2, on_layout=None, **kwargs):
+        super().__init__(self.wait, max_font_size, min_font_size, max_padding, **kwargs)
+        self.submit = submit
+        self.workers = workers
+        self.on_layout = on_layout
+        # {font_size: Future} submitted and not cancelled
+        self.futures = {}
+        self.submitted = 0
+
+    def start(self, font_size):
+        future = self.futures.get(font_size)
+        if future is None:
+            future = self.futures[font_size] = self.submit(font_size, self.max_padding,
+                                                           font_size + self.extra_leading)
+            self.submitted += 1
+        return future
+
+    def prefetch(self, font_sizes):
+        wanted = [font_size for font_size in font_sizes
+                  if font_size not in self.futures or not self.futures[font_size].done()][:self.workers]
+        for font_size, future in list(self.futures.items()):
+            if font_size not in wanted and future.cancel():
+                del self.futures[font_size]
+                self.submitted -= 1
+        for font_size in wanted:
+            self.start(font_size)
+
+    def wait(self, font_size, padding, leading):
+        layout = self.start(font_size).result()
+        if self.on_layout:
+            self.on_layout(font_size, padding, layout)
+        return layout
+
+    @property
+    def speculative(self):
+        """layouts measured or started which the search did not need"""
+        return self.submitted - self.layouts
+
+    def fit(self, start_font_size=None):
+        self.futures, self.submitted = {}, 0
+        try:
+            return super().fit(start_font_size)
+        finally:
+            for future in self.futures.values():
+                if future.cancel():
+                    self.submitted -= 1
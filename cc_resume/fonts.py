@@ -0,0 +1,166 @@
+import os
+import pickle
+import hashlib
+import logging
+import threading
+from weakref import WeakKeyDictionary
+
+import reportlab
+from reportlab import rl_config
+from reportlab.pdfbase import pdfmetrics, ttfonts
+
+from cc_resume import CURRENT_DIR, metrics
+
+LOG = logging.getLogger(__name__)
+
+FONTS_DIR = os.path.join(CURRENT_DIR, 'fonts')
+NORMAL, BOLD = 'normal', 'bold'
+FACES = {
+    NORMAL: os.path.join(FONTS_DIR, 'SourceHanSansCN-Normal.ttf'),
+    BOLD: os.path.join(FONTS_DIR, 'SourceHanSansCN-Bold.ttf'),
+}
+# bump when the cached attributes change, reportlab version is checked separately
+CACHE_VERSION = 2
+CACHE_NAME = '.fonts.cache'
+
+
+class CachedTTFontFace(ttfonts.TTFontFace):
+    """TTFontFace which takes the result of extractInfo (cmap, hmtx, loca...) from a cache instead of parsing"""
+
+    def __init__(self, filename, metrics=None):
+        self._cached_metrics = metrics
+        self.metrics = None
+        super().__init__(filename)
+        del self._cached_metrics
+
+    def extractInfo(self, charInfo=1):
+        if self._cached_metrics is not None:
+            self.__dict__.update(self._cached_metrics)
+            self.metrics = self._cached_metrics
+            return
+        before = dict(self.__dict__)
+        super().extractInfo(charInfo)
+        self.metrics = {k: v for k, v in self.__dict__.items()
+                        if k != '_pos' and (k not in before or before[k] is not v)}
+
+
+class CachedTTFont(ttfonts.TTFont):
+    def __init__(self, name, filename, metrics=None):
+        # same as TTFont.__init__, only the face class differs
+        self.fontName = name
+        self.face = CachedTTFontFace(filename, metrics=metrics)
+        self.encoding = ttfonts.TTEncoding()
+        self.state = WeakKeyDictionary()
+        self._asciiReadable = rl_config.ttfAsciiReadable
+
+
+def file_fingerprint(path):
+    stat = os.stat(path)
+    return stat.st_size, stat.st_mtime_ns
+
+
+def coverage_ranges(char_to_glyph):
+    """((first, last), ...) code point ranges of the cmap which map to a real glyph, not .notdef"""
+    ranges = []
+    for code in sorted(code for code, glyph in char_to_glyph.items() if glyph):
+        if ranges and ranges[-1][1] == code - 1:
+            ranges[-1][1] = code
+        else:
+            ranges.append([code, code])
+    return tuple((first, last) for first, last in ranges)
+
+
+class FontRegistry:
+    """register every face in pdfmetrics once per process, parsed metrics are cached in cache_dir"""
+
+    def __init__(self, faces=None):
+        self.faces = faces or FACES
+        self.fonts = {}
+        self.hashes = {}
+        # {face name: coverage_ranges of its cmap}, cached with the metrics
+        self.coverage = {}
+        self._lock = threading.Lock()
+
+    def cache_path(self, cache_dir):
+        return os.path.join(cache_dir, CACHE_NAME) if cache_dir else None
+
+    def load_cache(self, cache_dir):
+        path = self.cache_path(cache_dir)
+        if not path or not os.path.exists(path):
+            return {}
+        try:
+            with open(path, 'rb') as f:
+                cache = pickle.load(f)
+        except Exception as e:
+            LOG.warning(f'ignore broken font cache {path}, err={e}')
+            return {}
+        if cache.get('version') != CACHE_VERSION or cache.get('reportlab') != reportlab.Version:
+            return {}
+        return cache.get('faces', {})
+
+    def save_cache(self, cache_dir, faces):
+        path = self.cache_path(cache_dir)
+        if not path:
+            return
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        try:
+            with open(tmp_path, 'wb') as f:
+                pickle.dump({'version': CACHE_VERSION, 'reportlab': reportlab.Version, 'faces': faces}, f,
+                            protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            LOG.warning(f'save font cache {path} failed, err={e}')
+
+    def register(self, cache_dir=None):
+        """returns {face name: TTFont}, parsing the ttf files only the first time in this process"""
+        if len(self.fonts) == len(self.faces):
+            return self.fonts
+        with self._lock:
+            missing = [name for name in self.faces if name not in self.fonts]
+            if not missing:
+                return self.fonts
+            cached = self.load_cache(cache_dir)
+            dirty = False
+            for name in missing:
+                path = self.faces[name]
+                fingerprint = file_fingerprint(path)
+                entry = cached.get(name)
+                metrics = None
+                if entry and entry['path'] == path and entry['fingerprint'] == fingerprint:
+                    metrics = entry['metrics']
+                font = CachedTTFont(name, path, metrics=metrics)
+                if metrics is None:
+                    entry = cached[name] = {'path': path, 'fingerprint': fingerprint, 'metrics': font.face.metrics,
+                                            'sha256': hashlib.sha256(font.face._ttf_data).hexdigest()}
+                    dirty = True
+                if 'coverage' not in entry:
+                    entry['coverage'] = coverage_ranges(font.face.charToGlyph)
+                    dirty = True
+                self.hashes[name] = entry['sha256']
+                self.coverage[name] = entry['coverage']
+                font.face.metrics = None
+                pdfmetrics.registerFont(font)
+                self.fonts[name] = font
+            if dirty:
+                self.save_cache(cache_dir, cached)
+        return self.fonts
+
+
+REGISTRY = FontRegistry()
+
+
+def register_fonts(cache_dir=None):
+    with metrics.phase('fonts'):
+        return REGISTRY.register(cache_dir)
+
+
+def font_coverage(cache_dir=None):
+    """{face name: ((first, last), ...) code points the face has a glyph for}"""
+    register_fonts(cache_dir)
+    return dict(REGISTRY.coverage)
+
+
+def font_hashes(cache_dir=None):
+    """{face name: sha256 of the ttf file}"""
+    register_fonts(cache_dir)
+    return dict(REGISTRY.hashes)
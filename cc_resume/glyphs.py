@@ -0,0 +1,82 @@
+"""characters the bundled fonts can not draw, found before the first layout
+
+reportlab draws a character missing from the font cmap as .notdef, a box which is only seen in the pdf
+after the whole fit search. check_resume looks at every text of a resume at once:
+
+    glyphs.check_resume(data, layout.section_keys(data), glyphs.coverage_index(cache_dir))
+
+the index is built from the cmap ranges fonts.register_fonts keeps in the font cache, it is one regex
+character class of everything not covered, all texts are joined and searched in a single pass and only a
+resume with a hit is looked at field by field.
+"""
+import re
+import functools
+
+from cc_resume import fonts
+from cc_resume.markup import iter_texts
+
+# never drawn, reportlab breaks lines on them or maps nbsp to a space
+ALWAYS_COVERED = '\t\n\v\f\r\xa0'
+# separates the texts in the joined sweep, covered by ALWAYS_COVERED
+SEPARATOR = '\n'
+
+
+class GlyphError(ValueError):
+    def __init__(self, message, errors=()):
+        super().__init__(message)
+        # [(path, missing characters)] of every text with characters the fonts do not have
+        self.errors = list(errors)
+
+    def __reduce__(self):
+        return self.__class__, (str(self), self.errors)
+
+
+def intersect(coverages):
+    """code point ranges covered by every face, a text may be drawn in any of them"""
+    codes = None
+    for ranges in coverages:
+        face_codes = {code for first, last in ranges for code in range(first, last + 1)}
+        codes = face_codes if codes is None else codes & face_codes
+    return fonts.coverage_ranges(dict.fromkeys(codes or (), 1))
+
+
+class GlyphIndex:
+    def __init__(self, ranges):
+        self.ranges = ranges
+        allowed = ''.join(re.escape(char) for char in ALWAYS_COVERED)
+        allowed += ''.join(f'\\U{first:08x}-\\U{last:08x}' for first, last in ranges)
+        # any character outside the fonts
+        self.missing = re.compile(f'[^{allowed}]')
+
+    def covers(self, text):
+        return self.missing.search(text) is None
+
+    def missing_chars(self, text):
+        """characters of text without a glyph, each once in the order they appear"""
+        return ''.join(dict.fromkeys(self.missing.findall(text)))
+
+
+@functools.lru_cache(maxsize=8)
+def compile_index(coverages):
+    return GlyphIndex(intersect(coverages))
+
+
+def coverage_index(cache_dir=None):
+    """GlyphIndex of the registered fonts, built once per process"""
+    coverage = fonts.font_coverage(cache_dir)
+    return compile_index(tuple(coverage[name] for name in sorted(coverage)))
+
+
+def describe(chars):
+    return ' '.join(f'{char!r} U+{ord(char):04X}' for char in chars)
+
+
+def check_resume(data, sections, index):
+    """raise one GlyphError naming every text under the sections keys of data (and the custom titles in
+    layout) with characters the fonts do not cover"""
+    texts = [item for key in (*sections, 'layout') for item in iter_texts(data.get(key), key)]
+    if index.covers(SEPARATOR.join(text for _, text in texts)):
+        return
+    errors = [(path, index.missing_chars(text)) for path, text in texts if not index.covers(text)]
+    raise GlyphError('characters not in the fonts, ' + '; '.join(f'{path}: {describe(chars)}'
+                                                                 for path, chars in errors), errors)
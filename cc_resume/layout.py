@@ -0,0 +1,330 @@
+"""sections of the page described as data, compiled once into plans which every fit layout re-applies
+
+a section:
+
+    key: top level key of the resume, a mapping is one entry, a list has one entry per item
+    title: section title
+    title_blank_cell: the title row has an empty second cell
+    rows: rows of every entry
+      - cells: one or two cells
+          - text: markup with {field} of the entry ({value} when the entry is not a mapping),
+                  $size is the font size
+            style: normal (default), bold or inline (helvetica 10, fonts are set by <font> tags in text)
+            align: left (default), right or justify
+            nested: the cell holds a list with the paragraph, not the paragraph
+        span: the cells span both columns
+        top_padding: title (the title padding, solved by the fit search) or points
+        bottom_padding: points
+    descriptions: field of the entry with a list of lines, one justified row spanning both columns per line
+    labels: fixed texts of the section, {label} in a cell text like a field of the entry
+
+the resume yaml may have a layout list, its items are names of built in sections or sections as above,
+a section with the key of a built in one replaces it:
+
+    layout:
+      - author
+      - education
+      - key: skills
+        title: 技能
+        rows:
+          - cells: [{text: '{value}'}]
+            span: true
+            top_padding: title
+
+localize gives the sections with the titles and labels of a language in LANGUAGES.
+
+compile_section turns a section and its data into a SectionPlan, the compiled markup of every cell and
+the table style commands of every block with the title padding left open, CreatePdf only fills in the
+styles of the font size and the title padding of a layout.
+"""
+import re
+import pickle
+import hashlib
+
+from reportlab.lib.enums import TA_LEFT, TA_RIGHT, TA_JUSTIFY
+
+from cc_resume import markup
+from cc_resume.cache import LRUCache
+
+PLAN_CACHE_SIZE = 512
+TITLE = 'title'
+STYLES = ('normal', 'bold', 'inline')
+ALIGNMENTS = {'left': TA_LEFT, 'right': TA_RIGHT, 'justify': TA_JUSTIFY}
+SECTION_FIELDS = ('key', 'title', 'title_blank_cell', 'rows', 'descriptions', 'labels')
+ROW_FIELDS = ('cells', 'span', 'top_padding', 'bottom_padding')
+CELL_FIELDS = ('text', 'style', 'align', 'nested')
+
+SIZE = markup.SIZE
+# only plain field names, a layout from a request must not reach attributes of the data
+FIELD = re.compile(r'\{(\w+)\}')
+BUILTIN_SECTIONS = {
+    'author': {
+        'key': 'author',
+        'title': '个人信息',
+        'labels': {'basic_info': '基本信息: ', 'separator': '，'},
+        'rows': [
+            {'cells': [{'text': f'<font face=normal size={SIZE}>{{basic_info}}</font>'
+                                f'<font face=bold size={SIZE}>{{name}}</font>'
+                                f'<font face=normal size={SIZE}>{{separator}}{{msg}}</font>', 'style': 'inline'},
+                       {'text': '', 'align': 'justify'}],
+             'top_padding': TITLE},
+            {'cells': [{'text': '{contact}', 'align': 'justify', 'nested': True}], 'top_padding': 1, 'span': True},
+        ],
+    },
+    'education': {
+        'key': 'education',
+        'title': '教育经历',
+        'rows': [
+            {'cells': [{'text': '{university}', 'style': 'bold'}, {'text': '{year}', 'align': 'right'}],
+             'top_padding': TITLE},
+            {'cells': [{'text': '{degree}'}, {'text': '{location}', 'align': 'right'}], 'top_padding': 1},
+        ],
+    },
+    'experience': {
+        'key': 'experience',
+        'title': '工作经历',
+        'rows': [
+            {'cells': [{'text': '{company}', 'style': 'bold'}, {'text': '{duration}', 'align': 'right'}],
+             'top_padding': TITLE},
+            {'cells': [{'text': '{name}'}, {'text': '{location}', 'align': 'right'}], 'top_padding': 1},
+        ],
+        'descriptions': 'description',
+    },
+    'work_projects': {
+        'key': 'work_projects',
+        'title': '工作主要项目经历',
+        'rows': [
+            {'cells': [{'text': f'<font face=bold size={SIZE}>{{name}}</font>'
+                                f'   <font face=normal size={SIZE}>{{role}}</font>', 'style': 'inline'},
+                       {'text': '{duration}', 'align': 'right'}],
+             'top_padding': TITLE},
+        ],
+        'descriptions': 'description',
+    },
+    'open_projects': {
+        'key': 'open_projects',
+        'title': '个人开源项目',
+        'title_blank_cell': True,
+        'rows': [
+            {'cells': [{'text': f'<font face=bold size={SIZE}>{{name}}: </font>'
+                                f'<font face=normal size={SIZE}>{{description}}</font>'
+                                f'<font face=normal size={SIZE}>{{link}}</font>', 'style': 'bold'}],
+             'top_padding': TITLE, 'bottom_padding': 0, 'span': True},
+        ],
+    },
+    'summary': {
+        'key': 'summary',
+        'title': '个人总结',
+        'title_blank_cell': True,
+        'rows': [
+            {'cells': [{'text': '{value}'}], 'top_padding': TITLE, 'bottom_padding': 0, 'span': True},
+        ],
+    },
+}
+# sections of a resume without a layout key, in page order
+DEFAULT_LAYOUT = ('author', 'education', 'experience', 'work_projects', 'open_projects', 'summary')
+# {language: {section key: {title, labels}}}, the built in sections are zh
+LANGUAGES = {
+    'zh': {},
+    'en': {
+        'author': {'title': 'Personal Information', 'labels': {'basic_info': 'Profile: ', 'separator': ', '}},
+        'education': {'title': 'Education'},
+        'experience': {'title': 'Work Experience'},
+        'work_projects': {'title': 'Projects'},
+        'open_projects': {'title': 'Open Source Projects'},
+        'summary': {'title': 'Summary'},
+    },
+}
+
+_plans = LRUCache(maxsize=PLAN_CACHE_SIZE)
+
+
+class CellPlan:
+    def __init__(self, markup, style, alignment, nested):
+        self.markup = markup
+        self.style = style
+        self.alignment = alignment
+        self.nested = nested
+
+
+class BlockPlan:
+    """rows of CellPlan and table style commands of one Table block, TITLE stands for the title padding"""
+
+    def __init__(self, rows, styles, padding_rows):
+        self.rows = rows
+        self.styles = styles
+        self.padding_rows = padding_rows
+
+
+class SectionPlan:
+    def __init__(self, key, title, title_blank_cell, blocks):
+        self.key = key
+        self.title = compile_text(title, f'{key} title')
+        self.title_blank_cell = title_blank_cell
+        # the title block is not in blocks, its color and size come from the layout
+        self.blocks = blocks
+
+
+def check_fields(value, fields, path):
+    if not isinstance(value, dict):
+        raise ValueError(f'{path} must be a mapping')
+    unknown = set(value) - set(fields)
+    if unknown:
+        raise ValueError(f'{path} has unknown fields {", ".join(sorted(unknown))}')
+
+
+def check_section(section, path):
+    check_fields(section, SECTION_FIELDS, path)
+    if not section.get('key'):
+        raise ValueError(f'{path} needs a key')
+    labels = section.get('labels', {})
+    if not isinstance(labels, dict) or not all(isinstance(label, str) for label in labels.values()):
+        raise ValueError(f'{path}.labels must be a mapping of strings')
+    if not isinstance(section.get('rows', []), list):
+        raise ValueError(f'{path}.rows must be a list')
+    for i, row in enumerate(section.get('rows', [])):
+        row_path = f'{path}.rows[{i}]'
+        check_fields(row, ROW_FIELDS, row_path)
+        cells = row.get('cells')
+        if not isinstance(cells, list) or not 1 <= len(cells) <= 2:
+            raise ValueError(f'{row_path}.cells must be a list of one or two cells')
+        top_padding, bottom_padding = row.get('top_padding'), row.get('bottom_padding')
+        if top_padding is not None and top_padding != TITLE and not isinstance(top_padding, (int, float)):
+            raise ValueError(f'{row_path}.top_padding must be {TITLE} or a number')
+        if bottom_padding is not None and not isinstance(bottom_padding, (int, float)):
+            raise ValueError(f'{row_path}.bottom_padding must be a number')
+        for j, cell in enumerate(cells):
+            cell_path = f'{row_path}.cells[{j}]'
+            check_fields(cell, CELL_FIELDS, cell_path)
+            if not isinstance(cell.get('text'), str):
+                raise ValueError(f'{cell_path}.text must be a string')
+            if cell.get('style', 'normal') not in STYLES:
+                raise ValueError(f'{cell_path}.style must be one of {", ".join(STYLES)}')
+            if cell.get('align', 'left') not in ALIGNMENTS:
+                raise ValueError(f'{cell_path}.align must be one of {", ".join(ALIGNMENTS)}')
+
+
+def resume_layout(data):
+    """sections of data in page order, the layout key of data or DEFAULT_LAYOUT"""
+    items = data.get('layout')
+    if items is None:
+        return [BUILTIN_SECTIONS[name] for name in DEFAULT_LAYOUT]
+    if not isinstance(items, list):
+        raise ValueError('layout must be a list of sections')
+    sections = []
+    for i, item in enumerate(items):
+        if isinstance(item, str):
+            if item not in BUILTIN_SECTIONS:
+                raise ValueError(f'layout[{i}]: unknown section {item}, built in are {", ".join(BUILTIN_SECTIONS)}')
+            sections.append(BUILTIN_SECTIONS[item])
+            continue
+        check_section(item, f'layout[{i}]')
+        sections.append(item)
+    return sections
+
+
+def localize(sections, language=None, titles=None):
+    """copies of sections with the titles and labels of language, then the {section key: title} of titles"""
+    if language is not None and language not in LANGUAGES:
+        raise ValueError(f'unknown language {language}, known are {", ".join(LANGUAGES)}')
+    translations = LANGUAGES[language] if language else {}
+    localized = []
+    for section in sections:
+        translation = translations.get(section['key'], {})
+        section = dict(section, **{name: value for name, value in translation.items() if name != 'labels'})
+        if 'labels' in translation:
+            section['labels'] = dict(section.get('labels', {}), **translation['labels'])
+        if titles and section['key'] in titles:
+            section['title'] = titles[section['key']]
+        localized.append(section)
+    return localized
+
+
+def section_keys(data):
+    return [section['key'] for section in resume_layout(data)]
+
+
+def section_hash(section, value):
+    """a plan only depends on the section and its data"""
+    return hashlib.sha1(pickle.dumps((section, value), protocol=4)).hexdigest()
+
+
+def fill(text, entry, path, labels):
+    fields = {**labels, **entry} if isinstance(entry, dict) else dict(labels, value=entry)
+
+    def field(match):
+        if match.group(1) not in fields:
+            raise ValueError(f'{path} has no field {match.group(1)}')
+        return str(fields[match.group(1)])
+    return FIELD.sub(field, text)
+
+
+def add_row(rows, styles, cells, row):
+    """one row of rows, returns the number of title paddings in it"""
+    index = len(rows)
+    rows.append(cells)
+    padding_rows = 0
+    top_padding = row.get('top_padding')
+    if top_padding == TITLE:
+        styles.append(('TOPPADDING', (0, index), (1, index), TITLE))
+        padding_rows += 1
+    elif top_padding is not None:
+        styles.append(('TOPPADDING', (0, index), (1, index), top_padding))
+    if row.get('bottom_padding') is not None:
+        styles.append(('BOTTOMPADDING', (0, index), (1, index), row['bottom_padding']))
+    if row.get('span'):
+        styles.append(('SPAN', (0, index), (1, index)))
+    return padding_rows
+
+
+def compile_text(text, path, template=None):
+    """markup.compile_markup, a MarkupError names path and the layout template text was filled from"""
+    try:
+        return markup.compile_markup(text)
+    except markup.MarkupError as e:
+        message = f'{e}, filled from {template!r}' if template is not None else str(e)
+        raise markup.MarkupError(f'{path}: {message}', [(path, message)]) from None
+
+
+def compile_entry(section, entry, path):
+    rows, styles, padding_rows = [], [], 0
+    labels = section.get('labels', {})
+    for i, row in enumerate(section.get('rows', [])):
+        cells = [CellPlan(compile_text(fill(cell['text'], entry, path, labels), f'{path} rows[{i}].cells[{j}]',
+                                       cell['text']),
+                          cell.get('style', 'normal'), ALIGNMENTS[cell.get('align', 'left')], cell.get('nested', False))
+                 for j, cell in enumerate(row['cells'])]
+        padding_rows += add_row(rows, styles, cells, row)
+    if section.get('descriptions'):
+        if not isinstance(entry, dict) or section['descriptions'] not in entry:
+            raise ValueError(f'{path} has no field {section["descriptions"]}')
+        for i, line in enumerate(entry[section['descriptions']]):
+            cell = CellPlan(compile_text(line, f'{path}.{section["descriptions"]}[{i}]'), 'normal', TA_JUSTIFY, False)
+            add_row(rows, styles, [cell], {'top_padding': 1, 'span': True})
+    return BlockPlan(rows, styles, padding_rows)
+
+
+def compile_section(section, value, content_hash=None):
+    """SectionPlan of section filled with value, cached by content_hash (see section_hash)"""
+    content_hash = content_hash or section_hash(section, value)
+    plan = _plans.get(content_hash)
+    if plan is not None:
+        return plan
+    key = section['key']
+    entries = [(key, value)] if not isinstance(value, list) else [(f'{key}[{i}]', v) for i, v in enumerate(value)]
+    blocks = [compile_entry(section, entry, path) for path, entry in entries]
+    plan = SectionPlan(key, section.get('title', ''), section.get('title_blank_cell', False), blocks)
+    _plans.put(content_hash, plan)
+    return plan
+
+
+def compile_plans(data):
+    """compile the plan of every section of data, layout and markup errors come out before the first layout"""
+    for section in resume_layout(data):
+        value = data.get(section['key'])
+        if value is not None:
+            compile_section(section, value)
+
+
+def clear_plans():
+    _plans.clear()
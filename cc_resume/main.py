@@ -1,329 +1,477 @@
+import io
 import os
+import copy
+import re
+import json
+import functools
+import threading
 
-from reportlab.pdfbase import pdfmetrics, ttfonts
 from reportlab.lib.pagesizes import A4
 from reportlab.lib.units import inch
 from reportlab.platypus import SimpleDocTemplate, Paragraph, Table, TableStyle
+from reportlab.platypus.doctemplate import LayoutError
+from reportlab.platypus.frames import Frame, _FUZZ
 from reportlab.lib.styles import ParagraphStyle, getSampleStyleSheet
 from reportlab.lib import colors
-from reportlab.lib.enums import TA_RIGHT, TA_JUSTIFY
 
 from cc_resume.config import CONF
-from cc_resume import CURRENT_DIR, utils
+from cc_resume import Author, utils, fonts, metrics, layout, pdfsize
+from cc_resume.cache import LRUCache
+from cc_resume.data import load_resume, resume_sha256
+from cc_resume.fit import FitError, FitResult
+from cc_resume.manifest import BuildManifest, manifest_path
 
 PAGE_WIDTH, PAGE_HEIGHT = A4
+SECTION_CACHE_SIZE = 512
+# one Table per section, or one Table per entry, see CreatePdf.append_section
+TABLE_LAYOUT, STREAM_LAYOUT = 'table', 'stream'
+LAYOUT_MODES = (TABLE_LAYOUT, STREAM_LAYOUT)
 FULL_COLUMN_WIDTH = (PAGE_WIDTH - 1 * inch)
+_local = threading.local()
+
+
+def section_cache():
+    """built section tables of every CreatePdf in this thread, see CreatePdf.section_key
+
+    one cache per thread, wrap and split keep state on the Table so two threads must never share one
+    """
+    cache = getattr(_local, 'section_cache', None)
+    if cache is None:
+        cache = _local.section_cache = LRUCache(maxsize=SECTION_CACHE_SIZE)
+    return cache
+
+
+def shift_style(command, offset):
+    """table style command moved down by offset rows"""
+    name, (start_col, start_row), (end_col, end_row), *args = command
+    return (name, (start_col, start_row + offset), (end_col, end_row + offset), *args)
 
 
 class Fonts:
-    def __init__(self):
-        self.normal, path = 'normal', os.path.join(CURRENT_DIR, "fonts/SourceHanSansCN-Normal.ttf")
-        pdfmetrics.registerFont(ttfonts.TTFont(self.normal, path))
-        self.bold, path = 'bold', os.path.join(CURRENT_DIR, "fonts/SourceHanSansCN-Bold.ttf")
-        pdfmetrics.registerFont(ttfonts.TTFont(self.bold, path))
+    def __init__(self, cache_dir=None):
+        self.normal, self.bold = fonts.NORMAL, fonts.BOLD
+        fonts.register_fonts(cache_dir)
+
+
+@functools.lru_cache(maxsize=1024)
+def paragraph_style(face, font_size, alignment, text_color, leading):
+    # styles are never modified after creation, so every CreatePdf in the process shares one object per key
+    with metrics.phase('styles'):
+        return ParagraphStyle(face, fontName=face, fontSize=font_size, alignment=alignment, textColor=text_color,
+                              leading=leading)
+
+
+@functools.lru_cache(maxsize=None)
+def sample_style_sheet():
+    return getSampleStyleSheet()
 
 
 class FontStyle:
-    def __init__(self, default_font_size, paragraph_leading):
+    def __init__(self, default_font_size, paragraph_leading, cache_dir=None):
         self.default_font_size = default_font_size
         self.paragraph_leading = paragraph_leading
-        self.fonts = Fonts()
+        self.fonts = Fonts(cache_dir)
 
     def get_normal_style(self, font_size=None, alignment=0, leading=None):
         font_size = font_size or self.default_font_size
         leading = leading or self.paragraph_leading
-        return ParagraphStyle('normal', fontName=self.fonts.normal,
-                              fontSize=font_size, alignment=alignment, leading=leading)
+        return paragraph_style(self.fonts.normal, font_size, alignment, colors.black, leading)
 
     def get_bold_style(self, font_size=None, alignment=0, text_color=colors.black, leading=None):
         font_size = font_size or self.default_font_size
         leading = leading or self.paragraph_leading
-        return ParagraphStyle('bold', fontName=self.fonts.bold,
-                              fontSize=font_size, alignment=alignment, textColor=text_color, leading=leading)
+        return paragraph_style(self.fonts.bold, font_size, alignment, text_color, leading)
 
 
-class CreatePdf:
-    def __init__(self, font_size=None, title_padding=None, top_margin=None, bottom_margin=None, extra_leading=0):
-        self.default_size = font_size or CONF.font_size
-        self.default_title_padding = title_padding or CONF.title_padding
-        self.paragraph_leading = self.default_size + extra_leading
-        top_margin = top_margin or 0.2 * inch
-        bottom_margin = bottom_margin or 0.1 * inch
-        self.font_style = FontStyle(default_font_size=self.default_size, paragraph_leading=self.paragraph_leading)
-        from cc_resume.config import Author
-        from cc_resume import utils
-        yaml_path = os.path.join(CONF.resume.config_dir, CONF.resume.name)
-        file_name, file_extension = os.path.splitext(CONF.resume.name)
-        self.output_path = os.path.join(CONF.resume.config_dir, f"{file_name}.pdf")
-        self.doc = SimpleDocTemplate(self.output_path, pagesize=A4, showBoundary=0, leftMargin=0.4 * inch,
-                                     rightMargin=0.4 * inch,
-                                     topMargin=top_margin, bottomMargin=bottom_margin, title=f"Resume of {Author.name}",
-                                     author=Author.name)
-        self.data = utils.read_yaml(yaml_path)
+class SectionEntry:
+    def __init__(self, flowables, padding_rows):
+        self.flowables = flowables
+        self.padding_rows = padding_rows
+        # {avail width: wrapped height} of every flowable
+        self.heights = [{} for _ in flowables]
 
-        self.col_width = [FULL_COLUMN_WIDTH * 0.75, FULL_COLUMN_WIDTH * 0.25]
-        self.build_elements = []
 
-    def append_section_table_style(self, table_styles, running_row_index):
-        table_styles.append(('TOPPADDING', (0, running_row_index), (1, running_row_index), self.default_title_padding))
-        table_styles.append(('BOTTOMPADDING', (0, running_row_index), (1, running_row_index), self.default_title_padding))
-        table_styles.append(('LINEBELOW', (0, running_row_index), (-1, running_row_index), 1, colors.black))
+class Layout:
+    """result of laying out the flowables in memory, the same numbers doc.page and doc.frame._y give after build"""
+    def __init__(self, page, frame_y, height, content_height, frame_top, frame_bottom, padding_rows):
+        self.page = page
+        self.frame_y = frame_y
+        self.height = height
+        self.content_height = content_height
+        self.frame_top = frame_top
+        self.frame_bottom = frame_bottom
+        self.padding_rows = padding_rows
 
-    def config_education(self):
-        education_list = self.data['education']
-        table_data = []
-        table_styles = []
-        running_row_index = 0
-        # Append education heading
-        table_data.append(
-            [Paragraph("教育经历", self.font_style.get_bold_style(
-                font_size=self.default_size+1, text_color=CONF.resume.title_color))]
-        )
-        self.append_section_table_style(table_styles, running_row_index)
-        running_row_index += 1
-
-        # Append education
-        for education in education_list:
-            table_data.append([
-                Paragraph(education['university'], self.font_style.get_bold_style()),
-                Paragraph(education['year'], self.font_style.get_normal_style(alignment=TA_RIGHT)),
-            ])
-            table_styles.append(('TOPPADDING', (0, running_row_index), (1, running_row_index), self.default_title_padding))
-            running_row_index += 1
-
-            table_data.append([
-                Paragraph(education['degree'], self.font_style.get_normal_style()),
-                Paragraph(education['location'], self.font_style.get_normal_style(alignment=TA_RIGHT)),
-            ])
-            table_styles.append(('TOPPADDING', (0, running_row_index), (1, running_row_index), 1))
-            # table_styles.append(('ALIGN', (0, running_row_index), (1, running_row_index+1), 'RIGHT'))
-            running_row_index += 1
-
-        table_style = TableStyle(table_styles)
-        # Create the table and apply the style
-        table = Table(table_data, colWidths=self.col_width, spaceBefore=0, spaceAfter=0)
-        table.setStyle(table_style)
-        self.build_elements.append(table)
 
-    def config_experience(self):
-        education_list = self.data['experience']
-        table_data = []
-        table_styles = []
-        running_row_index = 0
-        # Append education heading
-        table_data.append(
-            [Paragraph("工作经历", self.font_style.get_bold_style(font_size=self.default_size+1, text_color=CONF.resume.title_color))]
-        )
-        self.append_section_table_style(table_styles, running_row_index)
-        running_row_index += 1
-
-        # Append education
-        for education in education_list:
-            table_data.append([
-                Paragraph(education['company'], self.font_style.get_bold_style()),
-                Paragraph(education['duration'], self.font_style.get_normal_style(alignment=TA_RIGHT)),
-            ])
-            table_styles.append(('TOPPADDING', (0, running_row_index), (1, running_row_index), self.default_title_padding))
-            running_row_index += 1
-
-            table_data.append([
-                Paragraph(education['name'], self.font_style.get_normal_style()),
-                Paragraph(education['location'], self.font_style.get_normal_style(alignment=TA_RIGHT)),
-            ])
-            table_styles.append(('TOPPADDING', (0, running_row_index), (1, running_row_index), 1))
-            # table_styles.append(('ALIGN', (0, running_row_index), (1, running_row_index+1), 'RIGHT'))
-            running_row_index += 1
-
-            for des in education['description']:
-                table_data.append(
-                    [Paragraph(des, self.font_style.get_normal_style(font_size=self.default_size, alignment=TA_JUSTIFY))]
-                )
-                table_styles.append(('TOPPADDING', (0, running_row_index), (1, running_row_index), 1))
-                table_styles.append(('SPAN', (0, running_row_index), (1, running_row_index)))
-                running_row_index += 1
-
-        table_style = TableStyle(table_styles)
-        # Create the table and apply the style
-        table = Table(table_data, colWidths=self.col_width, spaceBefore=0, spaceAfter=0)
-        table.setStyle(table_style)
-        self.build_elements.append(table)
+class CompactDocTemplate(SimpleDocTemplate):
+    """font subsets of this document start empty instead of with the 128 ascii glyphs reportlab puts in
+    every first subset to keep the content streams readable, a resume uses a few dozen of them"""
 
-    def config_projects(self):
-        education_list = self.data['work_projects']
-        table_data = []
-        table_styles = []
-        running_row_index = 0
-        # Append education heading
-        table_data.append(
-            [Paragraph("工作主要项目经历", self.font_style.get_bold_style(font_size=self.default_size+1, text_color=CONF.resume.title_color))]
-        )
-        self.append_section_table_style(table_styles, running_row_index)
-        running_row_index += 1
-
-        # Append education
-        for education in education_list:
-            ptext = f"<font face=bold size={self.default_size}>{education['name']}</font>" \
-                    f"   <font face=normal size={self.default_size}>{education['role']}</font>"
-            styles = getSampleStyleSheet()
-            # para = Paragraph(ptext, style=styles["Normal"])
-            # flowables.append(para)
-            table_data.append([
-                Paragraph(ptext, style=styles["Normal"]),
-                # Paragraph(education['name'], self.font_style.get_bold_style()),
-                Paragraph(education['duration'], self.font_style.get_normal_style(alignment=TA_RIGHT)),
-            ])
-            table_styles.append(('TOPPADDING', (0, running_row_index), (1, running_row_index),self.default_title_padding ))
-            running_row_index += 1
-
-            for des in education['description']:
-                table_data.append(
-                    [Paragraph(des, self.font_style.get_normal_style(font_size=self.default_size, alignment=TA_JUSTIFY))]
-                )
-                table_styles.append(('TOPPADDING', (0, running_row_index), (1, running_row_index), 1))
-                table_styles.append(('SPAN', (0, running_row_index), (1, running_row_index)))
-                running_row_index += 1
-
-        table_style = TableStyle(table_styles)
-        # Create the table and apply the style
-        table = Table(table_data, colWidths=self.col_width, spaceBefore=0, spaceAfter=0)
-        table.setStyle(table_style)
-        self.build_elements.append(table)
+    def beforeDocument(self):
+        doc = self.canv._doc
+        for font in fonts.REGISTRY.fonts.values():
+            font.state[doc] = font.State(False, font)
 
-    def config_author(self):
-        education = self.data['author']
-        table_data = []
-        table_styles = []
-        running_row_index = 0
-        # Append education heading
-        table_data.append(
-            [Paragraph("个人信息", self.font_style.get_bold_style(
-                font_size=self.default_size+1, text_color=CONF.resume.title_color))]
-        )
-        self.append_section_table_style(table_styles, running_row_index)
-        running_row_index += 1
-
-        ptext = f"<font face=normal size={self.default_size}>基本信息: </font>" \
-                f"<font face=bold size={self.default_size}>{education['name']}</font>" \
-                f"<font face=normal size={self.default_size}>，{education['msg']}</font>"
-        styles = getSampleStyleSheet()
-        table_data.append([
-            Paragraph(ptext, style=styles["Normal"]),
-            Paragraph("", self.font_style.get_normal_style(font_size=self.default_size, alignment=TA_JUSTIFY))
-        ])
-        table_styles.append(('TOPPADDING', (0, running_row_index), (1, running_row_index),self.default_title_padding ))
-        running_row_index += 1
-        table_data.append([
-            [Paragraph(education['contact'], self.font_style.get_normal_style(font_size=self.default_size, alignment=TA_JUSTIFY))]
-        ])
-        table_styles.append(('TOPPADDING', (0, running_row_index), (1, running_row_index), 1))
-        table_styles.append(('SPAN', (0, running_row_index), (1, running_row_index)))
-        running_row_index += 1
-
-        table_style = TableStyle(table_styles)
-        # Create the table and apply the style
-        table = Table(table_data, colWidths=self.col_width, spaceBefore=0, spaceAfter=0)
-        table.setStyle(table_style)
-        self.build_elements.append(table)
 
-    def config_open_projects(self):
-        data = self.data['open_projects']
-        table_data = []
-        table_styles = []
-        running_row_index = 0
-        table_data.append(
-            [
-                Paragraph("个人开源项目", self.font_style.get_bold_style(
-                    font_size=self.default_size + 1, text_color=colors.orange)),
-                Paragraph("")
-            ]
-        )
-        self.append_section_table_style(table_styles, running_row_index)
-        running_row_index += 1
-
-        for project in data:
-            ptext = f"<font face=bold size={self.default_size}>{project['name']}: </font>" \
-                    f"<font face=normal size={self.default_size}>{project['description']}</font>" \
-                    f"<font face=normal size={self.default_size}>{project['link']}</font>"
-            table_data.append([Paragraph(ptext, style=self.font_style.get_bold_style(font_size=self.default_size))])
-            table_styles.append(('TOPPADDING', (0, running_row_index), (1, running_row_index),self.default_title_padding ))
-            table_styles.append(('BOTTOMPADDING', (0, running_row_index), (1, running_row_index), 0))
-            table_styles.append(('SPAN', (0, running_row_index), (1, running_row_index)))
-            running_row_index += 1
-
-        table_style = TableStyle(table_styles)
-        # Create the table and apply the style
-        table = Table(table_data, colWidths=self.col_width, spaceBefore=0, spaceAfter=0)
-        table.setStyle(table_style)
-        self.build_elements.append(table)
+class CreatePdf:
+    def __init__(self, font_size=None, title_padding=None, top_margin=None, bottom_margin=None, extra_leading=0,
+                 yaml_path=None, output_path=None, data=None, title_color=None, cache_dir=None, layout_mode=None,
+                 compact=False):
+        """with data given nothing is read from CONF or disk and the pdf goes to output_path, a path or a
+        file object, io.BytesIO by default
+
+        compact writes the smallest pdf, see CompactDocTemplate and pdfsize.recompress
+        """
+        if data is None:
+            cache_dir = cache_dir or CONF.resume.config_dir
+            yaml_path = yaml_path or os.path.join(CONF.resume.config_dir, CONF.resume.name)
+            data = load_resume(yaml_path, cache_dir)
+            output_path = output_path or f"{os.path.splitext(yaml_path)[0]}.pdf"
+            font_size = font_size or CONF.font_size
+            title_padding = title_padding or CONF.title_padding
+        elif font_size is None or title_padding is None:
+            raise ValueError('font_size and title_padding are required with data')
+        self.default_size = font_size
+        self.default_title_padding = title_padding
+        self.paragraph_leading = self.default_size + extra_leading
+        top_margin = top_margin or 0.2 * inch
+        bottom_margin = bottom_margin or 0.1 * inch
+        self.font_style = FontStyle(default_font_size=self.default_size, paragraph_leading=self.paragraph_leading,
+                                    cache_dir=cache_dir)
+        self.title_color = colors.toColor(title_color or CONF.resume.title_color)
+        self.layout_mode = layout_mode or CONF.layout_mode
+        if self.layout_mode not in LAYOUT_MODES:
+            raise ValueError(f'layout_mode must be one of {", ".join(LAYOUT_MODES)}, not {self.layout_mode}')
+        self.output_path = output_path if output_path is not None else io.BytesIO()
+        self.compact = compact
+        # pdfsize.breakdown of the written pdf in compact mode
+        self.breakdown = None
+        template = CompactDocTemplate if compact else SimpleDocTemplate
+        # a compact pdf is rewritten after build, reportlab writes it to memory first
+        self.doc = template(io.BytesIO() if compact else self.output_path, pagesize=A4, showBoundary=0,
+                            leftMargin=0.4 * inch, rightMargin=0.4 * inch,
+                            topMargin=top_margin, bottomMargin=bottom_margin, title=f"Resume of {Author.name}",
+                            author=Author.name)
+        self.data = data
 
-    def config_summary(self):
-        data = self.data['summary']
+        self.col_width = [FULL_COLUMN_WIDTH * 0.75, FULL_COLUMN_WIDTH * 0.25]
+        self.build_elements = []
+        self.title_padding_rows = 0
+        # {id(flowable): SectionEntry.heights of the flowable} of build_elements
+        self.section_entries = {}
+
+    def cell_style(self, cell):
+        if cell.style == 'inline':
+            return sample_style_sheet()['Normal']
+        if cell.style == 'bold':
+            return self.font_style.get_bold_style(alignment=cell.alignment)
+        return self.font_style.get_normal_style(alignment=cell.alignment)
+
+    def block(self, block):
+        """(table_data, table_styles) of a layout.BlockPlan at the font size and title padding of this pdf"""
         table_data = []
-        table_styles = []
-        running_row_index = 0
-        table_data.append(
-            [
-                Paragraph("个人总结", self.font_style.get_bold_style(
-                    font_size=self.default_size + 1, text_color=CONF.resume.title_color)),
-                Paragraph("")
-            ]
-        )
-        self.append_section_table_style(table_styles, running_row_index)
-        running_row_index += 1
-
-        for line in data:
-            table_data.append([Paragraph(line, style=self.font_style.get_normal_style(font_size=self.default_size))])
-            table_styles.append(('TOPPADDING', (0, running_row_index), (1, running_row_index),self.default_title_padding ))
-            table_styles.append(('BOTTOMPADDING', (0, running_row_index), (1, running_row_index), 0))
-            table_styles.append(('SPAN', (0, running_row_index), (1, running_row_index)))
-            running_row_index += 1
-
-        table_style = TableStyle(table_styles)
-        # Create the table and apply the style
+        for row in block.rows:
+            cells = []
+            for cell in row:
+                paragraph = cell.markup.paragraph(self.cell_style(cell), size=self.default_size)
+                cells.append([paragraph] if cell.nested else paragraph)
+            table_data.append(cells)
+        # every title padding adds the same height, the fit engine solves padding from this count
+        self.title_padding_rows += block.padding_rows
+        return table_data, [self.title_padding(command) for command in block.styles]
+
+    def title_padding(self, command):
+        if command[0] in ('TOPPADDING', 'BOTTOMPADDING') and command[3] == layout.TITLE:
+            return command[:3] + (self.default_title_padding,)
+        return command
+
+    def section_title(self, plan):
+        """first block of every section, the colored title with a line below"""
+        cells = [plan.title.paragraph(self.font_style.get_bold_style(
+            font_size=self.default_size + 1, text_color=self.title_color), size=self.default_size)]
+        if plan.title_blank_cell:
+            cells.append(Paragraph(""))
+        table_styles = [('TOPPADDING', (0, 0), (1, 0), self.default_title_padding),
+                        ('BOTTOMPADDING', (0, 0), (1, 0), self.default_title_padding),
+                        ('LINEBELOW', (0, 0), (-1, 0), 1, colors.black)]
+        self.title_padding_rows += 2
+        return [cells], table_styles
+
+    def make_table(self, table_data, table_styles):
+        # reportlab pads short rows only up to the longest row, a table of spanned rows still needs both columns
+        table_data = [row + [''] * (len(self.col_width) - len(row)) for row in table_data]
         table = Table(table_data, colWidths=self.col_width, spaceBefore=0, spaceAfter=0)
-        table.setStyle(table_style)
-        self.build_elements.append(table)
+        table.setStyle(TableStyle(table_styles))
+        return table
+
+    def append_section(self, blocks):
+        """blocks are (table_data, table_styles) of the title and of every entry, rows counted from the block start
+
+        table layout joins them into one Table, stream layout makes one small Table per block so wrap and split
+        cost grows with the entry and not with the whole section
+        """
+        if self.layout_mode == STREAM_LAYOUT:
+            self.build_elements.extend(self.make_table(*block) for block in blocks)
+            return
+        table_data, table_styles = [], []
+        for rows, styles in blocks:
+            table_styles.extend(shift_style(command, len(table_data)) for command in styles)
+            table_data.extend(rows)
+        self.build_elements.append(self.make_table(table_data, table_styles))
+
+    def section_key(self, content_hash):
+        """a section table only depends on its section, its data and the layout parameters"""
+        return (content_hash, self.default_size, self.default_title_padding, self.paragraph_leading,
+                self.title_color, self.layout_mode)
 
     def add_data(self):
-        self.config_author()
-        self.config_education()
-        self.config_experience()
-        self.config_projects()
-        self.config_open_projects()
-        self.config_summary()
-
-    def build(self):
-        self.doc.build(self.build_elements)
-        print(f'pdf page is {self.doc.page}, path is {self.output_path}')
-
-
-def main():
+        with metrics.phase('sections'):
+            self._add_data()
+
+    def _add_data(self):
+        cache = section_cache()
+        for section in layout.resume_layout(self.data):
+            value = self.data.get(section['key'])
+            # a section of the layout without data is left out
+            if value is None:
+                continue
+            content_hash = layout.section_hash(section, value)
+            key = self.section_key(content_hash)
+            entry = cache.get(key)
+            if entry is None:
+                padding_rows, elements = self.title_padding_rows, len(self.build_elements)
+                # the plan is the same at every font size, only the first layout of a resume compiles it
+                plan = layout.compile_section(section, value, content_hash)
+                self.append_section([self.section_title(plan)] + [self.block(block) for block in plan.blocks])
+                entry = SectionEntry(self.build_elements[elements:], self.title_padding_rows - padding_rows)
+                del self.build_elements[elements:]
+                self.title_padding_rows = padding_rows
+                cache.put(key, entry)
+                metrics.count('section_cache_misses')
+            else:
+                metrics.count('section_cache_hits')
+            self.title_padding_rows += entry.padding_rows
+            for flowable, heights in zip(entry.flowables, entry.heights):
+                # doc.build leaves _postponed on a table it moved to the next page, a later build of the same
+                # object would take it for too large, every CreatePdf builds its own shallow copies
+                flowable = copy.copy(flowable)
+                self.build_elements.append(flowable)
+                self.section_entries[id(flowable)] = heights
+
+    def measure(self):
+        """wrap/split build_elements against the A4 frame like doc.build does, without canvas and without pdf file"""
+        with metrics.phase('layout'):
+            layout = self._measure()
+        metrics.count('layouts')
+        return layout
+
+    def _measure(self):
+        doc = self.doc
+        frame = Frame(doc.leftMargin, doc.bottomMargin, doc.width, doc.height)
+        frame_top = frame._y
+        page, content_height = 1, 0
+        # (flowable, is the flowable from build_elements rather than a split part)
+        pending = [(flowable, True) for flowable in self.build_elements]
+        while pending:
+            flowable, original = pending.pop(0)
+            space_before = 0 if frame._atTop else flowable.getSpaceBefore()
+            avail_width, avail_height = frame._getAvailableWidth(), frame._y - frame._y1p - space_before
+            if avail_height > 0:
+                heights = self.section_entries.get(id(flowable)) if original else None
+                wrapped = heights is None or avail_width not in heights
+                if wrapped:
+                    width, height = flowable.wrap(avail_width, avail_height)
+                    if heights is not None:
+                        heights[avail_width] = height
+                else:
+                    height = heights[avail_width]
+                if original:
+                    content_height += flowable.getSpaceBefore() + height + flowable.getSpaceAfter()
+                if frame._y - space_before - height >= frame._y1p - _FUZZ:
+                    frame._y -= space_before + height + flowable.getSpaceAfter()
+                    frame._atTop = 0
+                    continue
+                if not wrapped:
+                    # the cached height skipped wrap, split needs a wrapped flowable
+                    flowable.wrap(avail_width, avail_height)
+                parts = flowable.split(avail_width, avail_height)
+                if parts:
+                    pending[0:0] = [(part, False) for part in parts]
+                    continue
+            if frame._atTop:
+                raise LayoutError(f"Flowable {flowable.__class__} too large for frame")
+            page += 1
+            frame._reset()
+            # not wrapped yet when the frame is already full, count its height on the next page
+            pending.insert(0, (flowable, original and avail_height <= 0))
+        return Layout(page, frame._y, doc.height, content_height, frame_top, frame._y1p, self.title_padding_rows)
+
+    def build(self, verbose=True):
+        with metrics.phase('pdf'):
+            self.doc.build(self.build_elements)
+            if self.compact:
+                self.write_compact()
+        if verbose:
+            print(f'pdf page is {self.doc.page}, path is {self.output_path}')
+            if self.breakdown:
+                print(f'pdf bytes {pdfsize.format_breakdown(self.breakdown)}')
+
+    def write_compact(self):
+        content = pdfsize.recompress(self.doc.filename.getvalue())
+        self.breakdown = pdfsize.breakdown(content)
+        if isinstance(self.output_path, str):
+            write_pdf(self.output_path, content)
+        else:
+            self.output_path.write(content)
+
+
+def main(args=None):
     config_dir = utils.mkdir_config('resume')
     config_file_path = os.path.join(config_dir, '.resume.conf')
-    CONF(default_config_files=[config_file_path])
+    CONF(args or [], default_config_files=[config_file_path])
     create_one_page_pdf()
 
 
+def render_options(**kwargs):
+    """api.RenderOptions from the cli options"""
+    from cc_resume.api import RenderOptions
+    return RenderOptions(font_size=CONF.font_size, title_padding=CONF.title_padding,
+                         title_color=CONF.resume.title_color, layout_mode=CONF.layout_mode,
+                         fit_workers=CONF.fit_workers, compact=CONF.compact,
+                         check_glyphs=CONF.check_glyphs, **kwargs)
+
+
+def write_pdf(output_path, content):
+    tmp_path = f'{output_path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(content)
+    os.replace(tmp_path, output_path)
+
+
+def fit_one_page_pdf(yaml_path=None, output_path=None, verbose=True):
+    """fit the resume on one page and write the pdf, returns FitResult, raises FitError
+
+    nothing is built when the manifest says yaml, fonts, options and pdf are unchanged,
+    otherwise the search starts from the font size of the last successful build.
+    with --profile the timers and counters go to <yaml>.profile.json, --profile_cprofile adds <yaml>.prof
+    """
+    yaml_path = yaml_path or os.path.join(CONF.resume.config_dir, CONF.resume.name)
+    output_path = output_path or f"{os.path.splitext(yaml_path)[0]}.pdf"
+    stem = os.path.splitext(yaml_path)[0]
+    profiler = None
+    if CONF.profile_cprofile:
+        import cProfile
+        profiler = cProfile.Profile()
+    with metrics.recording() as recorder:
+        if profiler:
+            profiler.enable()
+        try:
+            result = _fit_one_page_pdf(yaml_path, output_path, verbose)
+        finally:
+            if profiler:
+                profiler.disable()
+                profiler.dump_stats(f'{stem}.prof')
+    if CONF.profile:
+        report = dict(recorder.report(), yaml_path=yaml_path, output_path=output_path, font_size=result.font_size,
+                      padding=result.padding, layouts=result.layouts, up_to_date=result.up_to_date)
+        with open(f'{stem}.profile.json', 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        if verbose:
+            print(metrics.format_report(report))
+            print(f'profile is written to {stem}.profile.json')
+    if profiler and verbose:
+        print(f'cProfile dump is written to {stem}.prof')
+    return result
+
+
+def _fit_one_page_pdf(yaml_path, output_path, verbose):
+    from cc_resume import api
+    cache_dir = CONF.resume.config_dir or os.path.dirname(yaml_path)
+    build_manifest = BuildManifest(manifest_path(cache_dir, yaml_path))
+    inputs = {
+        'yaml_sha256': resume_sha256(yaml_path, cache_dir),
+        'fonts_sha256': fonts.font_hashes(cache_dir),
+        'options': {'font_size': CONF.font_size, 'title_padding': CONF.title_padding,
+                    'title_color': str(CONF.resume.title_color), 'layout_mode': CONF.layout_mode,
+                    'compact': CONF.compact, 'check_glyphs': CONF.check_glyphs},
+    }
+    last = build_manifest.result
+    if last and not CONF.force and build_manifest.is_up_to_date(inputs, output_path):
+        result = FitResult(last['font_size'], last['padding'], last['leading'], 0, last['frame_y'],
+                           last['height'], last['content_height'])
+        result.output_path, result.up_to_date = output_path, True
+        if verbose:
+            print(f'{os.path.basename(yaml_path)} is not changed since the last build, path is {output_path}')
+        return result
+
+    def on_layout(font_size, padding, layout):
+        print(f'page={layout.page}, font_size={font_size}, padding={padding}, height={layout.height}, '
+              f'frame_height={layout.frame_y}')
+
+    options = render_options(cache_dir=cache_dir, start_font_size=last['font_size'] if last else None)
+    result = api.render(load_resume(yaml_path, cache_dir), options, on_layout=on_layout if verbose else None)
+    if verbose:
+        print(f'fit font_size={result.font_size}, padding={result.padding}, leading={result.leading} '
+              f'after {result.layouts} layouts')
+    with metrics.phase('write'):
+        write_pdf(output_path, result.pdf)
+    if verbose:
+        print(f'pdf page is {result.page}, path is {output_path}')
+        if result.breakdown:
+            print(f'pdf bytes {pdfsize.format_breakdown(result.breakdown)}')
+    result.output_path = output_path
+    build_manifest.save(inputs, {
+        'font_size': result.font_size, 'padding': result.padding, 'leading': result.leading,
+        'frame_y': result.frame_y, 'height': result.height, 'content_height': result.content_height,
+    }, output_path)
+    return result
+
+
+def fit_variant_pdfs(yaml_path=None, variants_path=None, verbose=True):
+    """one pdf per variant in the --variants yaml, written to <yaml>-<variant name>.pdf, returns [RenderResult]"""
+    from cc_resume import api
+    yaml_path = yaml_path or os.path.join(CONF.resume.config_dir, CONF.resume.name)
+    cache_dir = CONF.resume.config_dir or os.path.dirname(yaml_path)
+    variants_path = variants_path or CONF.variants
+    if not os.path.exists(variants_path):
+        variants_path = os.path.join(cache_dir, variants_path)
+    variants = utils.read_yaml(variants_path)
+    if not isinstance(variants, list) or not all(isinstance(variant, dict) for variant in variants):
+        raise ValueError(f'{variants_path} must be a list of variants')
+    stem = os.path.splitext(yaml_path)[0]
+    results = api.render_variants(load_resume(yaml_path, cache_dir), variants, render_options(cache_dir=cache_dir))
+    for i, result in enumerate(results, 1):
+        name = re.sub(r'[^\w.-]+', '_', str(result.variant.get('name') or i))
+        result.output_path = f'{stem}-{name}.pdf'
+        with metrics.phase('write'):
+            write_pdf(result.output_path, result.pdf)
+        if verbose:
+            print(f'{name}: font_size={result.font_size}, padding={result.padding}, layouts={result.layouts}, '
+                  f'path is {result.output_path}')
+    return results
+
+
+def write_merged_pdf(results, output_path, cache_dir=None):
+    """one pdf of every successful batch result (see batch.render_file) at the fit of its own pdf, no layout
+    is repeated, returns the page count"""
+    from cc_resume import api
+    resumes = []
+    for result in sorted(results, key=lambda r: r['name']):
+        fit = FitResult(result['font_size'], result['padding'], result['leading'], 0, None, None, None)
+        resumes.append((load_resume(result['yaml_path'], cache_dir), fit))
+    content, page = api.render_merged(resumes, render_options(cache_dir=cache_dir))
+    write_pdf(output_path, content)
+    return page
+
+
 def create_one_page_pdf():
-    title_padding = CONF.title_padding
-    extra_leading = 1
-    times = 1
-
-    for i in range(5):
-        font_size = CONF.font_size - i
-        for padding in list(range(1, title_padding+1))[::-1]:
-            print(f'create pdf {times} times')
-            pdf = CreatePdf(font_size, padding, extra_leading=extra_leading)
-            pdf.add_data()
-            pdf.build()
-            print(f'page={pdf.doc.page}, font_size={font_size}, padding={padding}, height={pdf.doc.height}, frame_height={pdf.doc.frame._y}')
-            if pdf.doc.page == 1:
-                if pdf.doc.frame._y < pdf.doc.height*0.2:
-                    return
-            times += 1
-            # time.sleep(0.5)
-    else:
-        print(f'generate failed')
+    try:
+        if CONF.variants:
+            fit_variant_pdfs()
+        else:
+            fit_one_page_pdf()
+    except (FitError, ValueError) as e:
+        print(f'generate failed, {e}')
         exit(1)
 
 
@@ -0,0 +1,86 @@
+import os
+import json
+import hashlib
+import logging
+import functools
+import importlib.util
+
+import reportlab
+
+from cc_resume.utils import file_sha256
+
+LOG = logging.getLogger(__name__)
+
+# bump when inputs or result fields change, an old manifest then never matches
+MANIFEST_VERSION = 1
+# modules which decide what a resume renders to, changing any of them rebuilds every pdf
+ENGINE_MODULES = ('api', 'fit', 'fonts', 'glyphs', 'layout', 'main', 'markup', 'pdfsize')
+
+
+@functools.lru_cache(maxsize=None)
+def engine_version():
+    """sha256 of the engine sources and the reportlab version, read once per process"""
+    sha256 = hashlib.sha256(reportlab.Version.encode())
+    for name in ENGINE_MODULES:
+        # the .pyc of an install without sources
+        sha256.update(file_sha256(importlib.util.find_spec(f'cc_resume.{name}').origin).encode())
+    return sha256.hexdigest()
+
+
+def manifest_path(cache_dir, yaml_path):
+    return os.path.join(cache_dir, f'.{os.path.basename(yaml_path)}.manifest.json')
+
+
+class BuildManifest:
+    """what the last successful build of one resume used and produced
+
+    inputs: yaml hash, font hashes and the options which change the layout or the checks
+    result: winning font_size/padding/leading of the fit, the next search starts there
+    engine_version: engine_version() of the build, a pdf of another layout or fit engine is rebuilt
+    output_sha256: hash of the written pdf
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.data = self.load()
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            LOG.warning(f'ignore broken manifest {self.path}, err={e}')
+            return {}
+        if data.get('version') != MANIFEST_VERSION:
+            return {}
+        return data
+
+    @property
+    def result(self):
+        return self.data.get('result')
+
+    def is_up_to_date(self, inputs, output_path):
+        if not self.data or self.data.get('inputs') != inputs or not os.path.exists(output_path):
+            return False
+        if self.data.get('engine_version') != engine_version():
+            return False
+        return file_sha256(output_path) == self.data.get('output_sha256')
+
+    def save(self, inputs, result, output_path):
+        self.data = {
+            'version': MANIFEST_VERSION,
+            'engine_version': engine_version(),
+            'inputs': inputs,
+            'result': result,
+            'output_path': output_path,
+            'output_sha256': file_sha256(output_path),
+        }
+        tmp_path = f'{self.path}.{os.getpid()}.tmp'
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.data, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            LOG.warning(f'save manifest {self.path} failed, err={e}')
@@ -0,0 +1,146 @@
+"""paragraph markup tokenized once and replayed for every font size of the fit search
+
+reportlab's Paragraph runs the html tokenizer of ParaParser over its text every time one is created, and
+the fit search creates the same paragraphs at several font sizes. compile_markup keeps the tokenizer
+events of a text, paragraph() feeds them to a fresh ParaParser with the style of this layout, which gives
+the same frags as Paragraph(text, style) without tokenizing again.
+
+markup written by the builders carries the font size as SIZE, it is filled in at replay:
+
+    markup.paragraph(f'<font face=bold size={markup.SIZE}>{name}</font>', style, size=15)
+
+compile_resume checks every text of a resume before the first layout, a broken <a href> in author.contact
+is reported with its path instead of failing inside a build.
+"""
+import functools
+
+from reportlab.lib.styles import ParagraphStyle
+from reportlab.platypus.paragraph import Paragraph, cleanBlockQuotedText, textTransformFrags
+from reportlab.platypus.paraparser import ParaParser
+
+SIZE = '$size'
+MARKUP_CACHE_SIZE = 4096
+# HTMLParser callbacks of ParaParser, a text is tokenized into calls of these
+HANDLERS = tuple(name for name in dir(ParaParser) if name.startswith(('handle_', 'unknown_')))
+# texts are checked at compile time with this style, SIZE stands for its font size
+COMPILE_STYLE = ParagraphStyle('compile')
+
+
+class MarkupError(ValueError):
+    def __init__(self, message, errors=()):
+        super().__init__(message)
+        # [(path, message)] of every broken text
+        self.errors = list(errors)
+
+    def __reduce__(self):
+        # raised in fit workers too, the default pickling would drop errors
+        return self.__class__, (str(self), self.errors)
+
+
+def fill_size(name, args, size):
+    if size is None or name not in ('handle_starttag', 'handle_startendtag'):
+        return args
+    tag, attrs = args
+    if not any(value == SIZE for _, value in attrs):
+        return args
+    return tag, [(key, str(size) if value == SIZE else value) for key, value in attrs]
+
+
+def new_parser():
+    parser = ParaParser()
+    # as Paragraph does
+    parser.caseSensitive = 1
+    return parser
+
+
+def recording_handler(name):
+    handler = getattr(ParaParser, name)
+
+    def record(self, *args):
+        # handle_startendtag and handle_entityref call other handlers, only the outermost call is an event
+        if self.nested:
+            return handler(self, *args)
+        self.events.append((name, args))
+        self.nested = True
+        try:
+            return handler(self, *fill_size(name, args, COMPILE_STYLE.fontSize))
+        finally:
+            self.nested = False
+    return record
+
+
+class RecordingParser(ParaParser):
+    def __init__(self):
+        super().__init__()
+        self.caseSensitive = 1
+        self.events = []
+        self.nested = False
+
+
+for _name in HANDLERS:
+    setattr(RecordingParser, _name, recording_handler(_name))
+
+
+class Markup:
+    """tokenizer events of one paragraph text, raises MarkupError when reportlab can not parse the text"""
+
+    def __init__(self, text):
+        self.text = cleanBlockQuotedText(text)
+        parser = RecordingParser()
+        try:
+            _, frags, _ = parser.parse(self.text, COMPILE_STYLE)
+        except ValueError as e:
+            # annotateException puts the whole text in front of the reason
+            raise MarkupError(str(e).strip().split(' caused exception ')[-1].strip()) from None
+        if frags is None:
+            raise MarkupError(parser.errors[0])
+        self.events = parser.events
+        for name, args in self.events:
+            # reportlab draws an <a> without href as plain text, the link is silently lost
+            if name in ('handle_starttag', 'handle_startendtag') and args[0].lower() == 'a':
+                attrs = dict(args[1])
+                if not (attrs.get('href') or '').strip() and 'name' not in attrs:
+                    raise MarkupError('<a> without href')
+
+    def paragraph(self, style, size=None):
+        """the same Paragraph as Paragraph(text, style) with SIZE replaced by size"""
+        parser = new_parser()
+        parser._setup_for_parse(style)
+        for name, args in self.events:
+            getattr(parser, name)(*fill_size(name, args, size))
+        style, frags, bullet_frags = parser._complete_parse()
+        textTransformFrags(frags, style)
+        return Paragraph(self.text, style, bulletText=bullet_frags, frags=frags)
+
+
+@functools.lru_cache(maxsize=MARKUP_CACHE_SIZE)
+def compile_markup(text):
+    return Markup(text)
+
+
+def paragraph(text, style, size=None):
+    return compile_markup(text).paragraph(style, size)
+
+
+def iter_texts(value, path):
+    if isinstance(value, str):
+        yield path, value
+    elif isinstance(value, dict):
+        for key, item in value.items():
+            yield from iter_texts(item, f'{path}.{key}')
+    elif isinstance(value, list):
+        for i, item in enumerate(value):
+            yield from iter_texts(item, f'{path}[{i}]')
+
+
+def compile_resume(data, sections):
+    """compile every text under the sections keys of data, raises one MarkupError naming every broken field"""
+    errors = []
+    for section in sections:
+        for path, text in iter_texts(data.get(section), section):
+            try:
+                compile_markup(text)
+            except MarkupError as e:
+                errors.append((path, str(e)))
+    if errors:
+        raise MarkupError('; '.join(f'{path}: {message}' for path, message in errors), errors)
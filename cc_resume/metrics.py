@@ -0,0 +1,135 @@
+"""timers and counters of render runs
+
+    with metrics.recording() as recorder:
+        api.render(data)
+    recorder.report()  # {'seconds': ..., 'phases': {'layout': {'seconds': ..., 'calls': ...}}, 'counters': {...}}
+
+phases are yaml, fonts, glyphs, markup, styles, sections, layout, fit, pdf and write, styles is part of sections and
+sections/layout are part of fit, so phase times overlap. the recorder of the running render is kept in a
+contextvar, phase() and count() do nothing outside of recording(), so threads and asyncio tasks each
+record their own render.
+
+a service exports the numbers with a hook:
+
+    class Exporter(metrics.Hook):
+        def on_render(self, report):
+            ...
+    metrics.add_hook(Exporter())
+"""
+import time
+import threading
+import contextlib
+import contextvars
+
+_current = contextvars.ContextVar('cc_resume_recorder', default=None)
+_hooks = []
+_hooks_lock = threading.Lock()
+
+
+class Hook:
+    """base class of exporters, called in the rendering thread, override what is needed"""
+
+    def on_phase(self, name, seconds):
+        pass
+
+    def on_count(self, name, value):
+        pass
+
+    def on_render(self, report):
+        pass
+
+
+def add_hook(hook):
+    with _hooks_lock:
+        _hooks.append(hook)
+
+
+def remove_hook(hook):
+    with _hooks_lock:
+        _hooks.remove(hook)
+
+
+class Recorder:
+    def __init__(self, hooks=None):
+        self.hooks = list(_hooks) + list(hooks or [])
+        # {name: [seconds, calls]}
+        self.phases = {}
+        self.counters = {}
+        self.start = time.perf_counter()
+        self.seconds = None
+
+    def add_time(self, name, seconds):
+        phase = self.phases.setdefault(name, [0, 0])
+        phase[0] += seconds
+        phase[1] += 1
+        for hook in self.hooks:
+            hook.on_phase(name, seconds)
+
+    def count(self, name, value=1):
+        self.counters[name] = self.counters.get(name, 0) + value
+        for hook in self.hooks:
+            hook.on_count(name, value)
+
+    def finish(self):
+        self.seconds = time.perf_counter() - self.start
+        report = self.report()
+        for hook in self.hooks:
+            hook.on_render(report)
+
+    def report(self):
+        seconds = self.seconds if self.seconds is not None else time.perf_counter() - self.start
+        return {
+            'seconds': seconds,
+            'phases': {name: {'seconds': s, 'calls': calls} for name, (s, calls) in self.phases.items()},
+            'counters': dict(self.counters),
+        }
+
+
+def current():
+    return _current.get()
+
+
+@contextlib.contextmanager
+def recording(hooks=None):
+    """record everything rendered inside, a nested recording() adds to the outer recorder and its hooks"""
+    recorder = _current.get()
+    if recorder is not None:
+        recorder.hooks.extend(hook for hook in hooks or [] if hook not in recorder.hooks)
+        yield recorder
+        return
+    recorder = Recorder(hooks)
+    token = _current.set(recorder)
+    try:
+        yield recorder
+    finally:
+        _current.reset(token)
+        recorder.finish()
+
+
+@contextlib.contextmanager
+def phase(name):
+    recorder = _current.get()
+    if recorder is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        recorder.add_time(name, time.perf_counter() - start)
+
+
+def count(name, value=1):
+    recorder = _current.get()
+    if recorder is not None:
+        recorder.count(name, value)
+
+
+def format_report(report):
+    """one line per phase, slowest first"""
+    lines = [f"total {report['seconds'] * 1000:.1f} ms"]
+    for name, phase in sorted(report['phases'].items(), key=lambda item: -item[1]['seconds']):
+        lines.append(f"  {name:<10} {phase['seconds'] * 1000:9.1f} ms  {phase['calls']:>4} calls")
+    for name, value in sorted(report['counters'].items()):
+        lines.append(f"  {name:<24} {value}")
+    return '\n'.join(lines)
@@ -0,0 +1,144 @@
+"""byte breakdown of a pdf and the compact rewrite of reportlab output
+
+    breakdown(pdf)   # {'total': ..., 'font_files': ..., 'font_metrics': ..., 'content': ..., 'other': ...}
+    recompress(pdf)  # same pdf, every stream flate level 9 without the ascii85 layer
+
+reportlab writes a plain xref table and no object streams, objects are read through the xref offsets. a
+pdf with an xref stream is refused, a stream with /DecodeParms, an indirect /Length or another filter is
+copied as it is.
+"""
+import re
+import zlib
+
+from reportlab.lib.rl_accel import asciiBase85Decode
+
+STARTXREF = re.compile(rb'startxref\s+(\d+)\s+%%EOF\s*$')
+XREF_ENTRY = re.compile(rb'(\d{10}) (\d{5}) ([nf])')
+# a direct length, /Length 12 0 R refers to another object
+LENGTH = re.compile(rb'/Length (\d+)(?!\s+\d+\s+R)')
+FILTER = re.compile(rb'/Filter\s*(\[[^\]]*\]|/\w+)')
+STREAM = b'\nstream\n'
+ENDSTREAM = b'\nendstream\nendobj\n'
+FONT_KEYS = (b'/Type /Font', b'/FontDescriptor', b'/FontFile', b'/Widths', b'/DescendantFonts')
+
+
+class PdfObject:
+    def __init__(self, number, header, stream=None, tail=b''):
+        self.number = number
+        # bytes from 'n 0 obj' up to stream, or the whole object without stream
+        self.header = header
+        self.stream = stream
+        # bytes after the stream data up to the end of endobj
+        self.tail = tail
+
+    @property
+    def size(self):
+        if self.stream is None:
+            return len(self.header)
+        return len(self.header) + len(STREAM) + len(self.stream) + len(self.tail)
+
+    def filters(self):
+        match = FILTER.search(self.header)
+        return re.findall(rb'/(\w+)', match.group(1)) if match else []
+
+    def decoded(self):
+        """stream content without filters, None when a filter is not ascii85 or flate, takes parameters or the
+        length is indirect"""
+        if b'/DecodeParms' in self.header or not LENGTH.search(self.header):
+            return None
+        data = self.stream
+        for name in self.filters():
+            if name == b'ASCII85Decode':
+                data = asciiBase85Decode(data.strip())
+            elif name == b'FlateDecode':
+                data = zlib.decompress(data)
+            else:
+                return None
+        return data
+
+
+def read_objects(pdf):
+    """(body start, [PdfObject] in file order, trailer bytes between trailer and startxref)"""
+    match = STARTXREF.search(pdf)
+    if match is None:
+        raise ValueError('no startxref, not a pdf written by reportlab')
+    xref = int(match.group(1))
+    if not pdf.startswith(b'xref', xref):
+        raise ValueError('xref stream, only pdfs with an xref table are read')
+    trailer_start = pdf.index(b'trailer', xref)
+    entries = XREF_ENTRY.findall(pdf[xref:trailer_start])
+    offsets = sorted((int(offset), number) for number, (offset, _, kind) in enumerate(entries) if kind == b'n')
+    objects = []
+    for offset, number in offsets:
+        stream_at, end_at = pdf.find(STREAM, offset), pdf.find(b'endobj', offset)
+        if stream_at != -1 and stream_at < end_at:
+            header = pdf[offset:stream_at]
+            start = stream_at + len(STREAM)
+            length = LENGTH.search(header)
+            if length is not None:
+                length = int(length.group(1))
+            else:
+                # indirect length, the stream ends before the end of line in front of endstream
+                length = pdf.index(b'endstream', start) - start
+                length -= 2 if pdf[start + length - 2:start + length] == b'\r\n' else 1
+            # the length of an ascii85 stream counts the newline before endstream
+            end = pdf.index(b'endobj', start + length) + len(b'endobj\n')
+            objects.append(PdfObject(number, header, pdf[start:start + length], pdf[start + length:end]))
+        else:
+            objects.append(PdfObject(number, pdf[offset:end_at + len(b'endobj\n')]))
+    return offsets[0][0], objects, pdf[trailer_start:match.start()]
+
+
+def breakdown(pdf):
+    """bytes of embedded font files, font dictionaries/widths/tounicode maps, page content and the rest"""
+    _, objects, _ = read_objects(pdf)
+    sizes = {'total': len(pdf), 'font_files': 0, 'font_metrics': 0, 'content': 0, 'other': 0}
+    for obj in objects:
+        if obj.stream is not None and b'/Length1' in obj.header:
+            kind = 'font_files'
+        elif any(key in obj.header for key in FONT_KEYS):
+            kind = 'font_metrics'
+        elif obj.stream is not None:
+            data = obj.decoded()
+            kind = 'font_metrics' if data is not None and b'begincmap' in data else 'content'
+        else:
+            kind = 'other'
+        sizes[kind] += obj.size
+    sizes['other'] += len(pdf) - sum(sizes[kind] for kind in ('font_files', 'font_metrics', 'content', 'other'))
+    return sizes
+
+
+def recompress(pdf, level=9):
+    """rewrite every ascii85/flate stream as flate at level, offsets and xref are written anew"""
+    body_start, objects, trailer = read_objects(pdf)
+    out = bytearray(pdf[:body_start])
+    offsets = {}
+    for obj in objects:
+        offsets[obj.number] = len(out)
+        data = obj.decoded() if obj.stream is not None else None
+        if data is None:
+            out += obj.header
+            if obj.stream is not None:
+                out += STREAM + obj.stream + obj.tail
+            continue
+        stream = zlib.compress(data, level)
+        if FILTER.search(obj.header):
+            header = FILTER.sub(b'/Filter [ /FlateDecode ]', obj.header, count=1)
+        else:
+            header = obj.header.replace(b'<<', b'<<\n/Filter [ /FlateDecode ]', 1)
+        header = LENGTH.sub(b'/Length %d' % len(stream), header, count=1)
+        out += header + STREAM + stream + ENDSTREAM
+    xref = len(out)
+    size = max(offsets) + 1
+    out += b'xref\n0 %d\n0000000000 65535 f \n' % size
+    for number in range(1, size):
+        if number in offsets:
+            out += b'%010d 00000 n \n' % offsets[number]
+        else:
+            out += b'0000000000 65535 f \n'
+    out += trailer + b'startxref\n%d\n%%%%EOF\n' % xref
+    return bytes(out)
+
+
+def format_breakdown(sizes):
+    return ', '.join(f'{kind}={sizes[kind]}' for kind in ('total', 'font_files', 'font_metrics', 'content', 'other'))
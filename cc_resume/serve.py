@@ -0,0 +1,380 @@
+"""cc-resume serve: render resumes over http with a warm process pool
+
+    POST /render   body is the resume yaml or json, query string may set font_size, title_padding,
+                   min_font_size, title_color, layout_mode, check_glyphs and compact over the cli options,
+                   answers the one page pdf, a json list of the broken fields for a markup or glyph error
+    GET /metrics   prometheus text format, latency histograms and counters
+    GET /health    ok
+
+at most workers + serve_queue renders are accepted at a time, more requests get 503 right away
+instead of waiting in memory
+"""
+import os
+import json
+import time
+import asyncio
+import logging
+import dataclasses
+import threading
+import multiprocessing
+import urllib.parse
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from reportlab.platypus.doctemplate import LayoutError
+
+from cc_resume import api, utils
+from cc_resume.fit import FitError
+from cc_resume.glyphs import GlyphError
+from cc_resume.markup import MarkupError
+
+LOG = logging.getLogger(__name__)
+
+MAX_HEADER_SIZE = 64 * 1024
+MAX_BODY_SIZE = 1024 * 1024
+READ_TIMEOUT = 30
+# seconds every worker may take to start, import reportlab and register the fonts
+START_TIMEOUT = 60
+LATENCY_BUCKETS = (0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+LAYOUT_BUCKETS = (1, 2, 3, 4, 6, 8, 12)
+REASONS = {
+    200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed', 408: 'Request Timeout',
+    413: 'Payload Too Large', 422: 'Unprocessable Entity', 500: 'Internal Server Error',
+    503: 'Service Unavailable',
+}
+
+
+def boolean(value):
+    """query string flag, 1, true, yes or 0, false, no"""
+    if value.lower() in ('1', 'true', 'yes'):
+        return True
+    if value.lower() in ('0', 'false', 'no'):
+        return False
+    raise ValueError(value)
+
+
+# query string options of POST /render, see api.RenderOptions
+OPTION_TYPES = {'font_size': float, 'title_padding': float, 'min_font_size': float, 'title_color': str,
+                'layout_mode': str, 'check_glyphs': boolean, 'compact': boolean}
+
+
+class HttpError(Exception):
+    def __init__(self, status, message=None, errors=None):
+        super().__init__(message or REASONS[status])
+        self.status = status
+        # [(path, message)] of a markup or glyph error, answered as json
+        self.errors = errors
+
+
+# set by init_worker, start_pool holds every worker on it until all of them are running
+START_BARRIER = None
+
+
+def init_worker(cache_dir, barrier=None):
+    # import reportlab and register the fonts before the first request arrives
+    global START_BARRIER
+    from cc_resume import main
+    main.Fonts(cache_dir)
+    START_BARRIER = barrier
+
+
+def worker_pid():
+    """blocks until every worker runs one, so each of them answers exactly once"""
+    if START_BARRIER is not None:
+        START_BARRIER.wait()
+    return os.getpid()
+
+
+class BodyError(ValueError):
+    """the request body is not a yaml or json mapping"""
+
+
+def load_body(body, is_json):
+    try:
+        data = json.loads(body) if is_json else utils.load_yaml(body.decode('utf-8'))
+    except Exception as e:
+        raise BodyError(str(e))
+    if not isinstance(data, dict):
+        raise BodyError('top level must be a mapping')
+    return data
+
+
+def render_payload(body, is_json, options):
+    """runs in a worker, the body is parsed there too so a big one does not hold up the event loop,
+    returns (pdf bytes, result dict)"""
+    start = time.perf_counter()
+    result = api.render(load_body(body, is_json), options)
+    return result.pdf, {'page': result.page, 'font_size': result.font_size, 'padding': result.padding,
+                        'layouts': result.layouts, 'seconds': time.perf_counter() - start}, result.metrics
+
+
+class Histogram:
+    def __init__(self, name, help_text, buckets=LATENCY_BUCKETS, labels=''):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = buckets
+        # 'phase="layout"', the same name with other labels is another Histogram of the same family
+        self.labels = labels
+        self.counts = [0] * len(buckets)
+        self.sum = 0
+        self.count = 0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+        self.sum += value
+        self.count += 1
+
+    def expose(self, header=True):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} histogram'] if header else []
+        prefix = f'{self.labels},' if self.labels else ''
+        suffix = f'{{{self.labels}}}' if self.labels else ''
+        for bound, count in zip(self.buckets, self.counts):
+            lines.append(f'{self.name}_bucket{{{prefix}le="{bound}"}} {count}')
+        lines.append(f'{self.name}_bucket{{{prefix}le="+Inf"}} {self.count}')
+        lines.append(f'{self.name}_sum{suffix} {self.sum}')
+        lines.append(f'{self.name}_count{suffix} {self.count}')
+        return lines
+
+
+class Metrics:
+    """everything is updated from the event loop thread only, no locking"""
+
+    def __init__(self):
+        self.request_seconds = Histogram('cc_resume_request_seconds', 'POST /render latency, queue wait included')
+        self.render_seconds = Histogram('cc_resume_render_seconds', 'time spent in the worker')
+        self.queue_seconds = Histogram('cc_resume_queue_seconds', 'time waiting for a free worker')
+        self.layouts = Histogram('cc_resume_layouts', 'layouts tried by the fit search', LAYOUT_BUCKETS)
+        # {phase: Histogram} from the metrics.Recorder report of every render
+        self.phases = {}
+        # {status code: count} of POST /render
+        self.responses = {}
+        self.inflight = 0
+
+    def observe_phases(self, report):
+        for name, phase in report['phases'].items():
+            if name not in self.phases:
+                self.phases[name] = Histogram('cc_resume_phase_seconds', 'time of one render phase',
+                                              labels=f'phase="{name}"')
+            self.phases[name].observe(phase['seconds'])
+
+    def expose(self):
+        lines = []
+        for histogram in (self.request_seconds, self.render_seconds, self.queue_seconds, self.layouts):
+            lines.extend(histogram.expose())
+        for i, name in enumerate(sorted(self.phases)):
+            lines.extend(self.phases[name].expose(header=i == 0))
+        lines.extend(['# HELP cc_resume_responses_total POST /render responses by status',
+                      '# TYPE cc_resume_responses_total counter'])
+        for status, count in sorted(self.responses.items()):
+            lines.append(f'cc_resume_responses_total{{status="{status}"}} {count}')
+        lines.extend(['# HELP cc_resume_inflight renders accepted and not answered yet',
+                      '# TYPE cc_resume_inflight gauge', f'cc_resume_inflight {self.inflight}'])
+        return '\n'.join(lines) + '\n'
+
+
+class RenderServer:
+    def __init__(self, host, port, workers, queue_size, cache_dir=None, options=None):
+        self.host = host
+        self.port = port
+        self.workers = workers or os.cpu_count()
+        self.limit = self.workers + queue_size
+        self.cache_dir = cache_dir
+        # api.RenderOptions of every request, main.render_options() for cc-resume serve,
+        # the query string of a request overrides them
+        self.options = options or api.RenderOptions(cache_dir=cache_dir)
+        self.metrics = Metrics()
+        self.pool = None
+
+    async def start_pool(self):
+        """start every worker now, so no request pays for the process start, imports and fonts"""
+        # the pool starts a process only when no idle one is left, a fast worker could take every task
+        barrier = multiprocessing.Barrier(self.workers, timeout=START_TIMEOUT)
+        self.pool = ProcessPoolExecutor(max_workers=self.workers, initializer=init_worker,
+                                        initargs=(self.cache_dir, barrier))
+        loop = asyncio.get_running_loop()
+        try:
+            pids = await asyncio.gather(*[loop.run_in_executor(self.pool, worker_pid)
+                                          for _ in range(self.workers)])
+        except threading.BrokenBarrierError:
+            pids = []
+        if len(set(pids)) < self.workers:
+            self.pool.shutdown(wait=False)
+            raise RuntimeError(f'only {len(set(pids))} of {self.workers} workers started '
+                               f'in {START_TIMEOUT} seconds')
+        print(f'{len(set(pids))} workers ready')
+
+    async def read_request(self, reader):
+        """returns (method, path, query, headers, body), None when the client closed the connection"""
+        try:
+            head = await asyncio.wait_for(reader.readuntil(b'\r\n\r\n'), READ_TIMEOUT)
+        except asyncio.IncompleteReadError:
+            return None
+        except asyncio.LimitOverrunError:
+            raise HttpError(413, 'header too large')
+        except asyncio.TimeoutError:
+            raise HttpError(408)
+        lines = head.decode('latin-1').split('\r\n')
+        try:
+            method, target, version = lines[0].split(' ')
+        except ValueError:
+            raise HttpError(400, 'bad request line')
+        headers = {}
+        for line in lines[1:]:
+            if line:
+                name, _, value = line.partition(':')
+                headers[name.strip().lower()] = value.strip()
+        try:
+            length = int(headers.get('content-length') or 0)
+        except ValueError:
+            raise HttpError(400, 'bad content-length')
+        if length > MAX_BODY_SIZE:
+            raise HttpError(413)
+        try:
+            body = await asyncio.wait_for(reader.readexactly(length), READ_TIMEOUT) if length else b''
+        except asyncio.IncompleteReadError:
+            return None
+        except asyncio.TimeoutError:
+            raise HttpError(408)
+        url = urllib.parse.urlsplit(target)
+        return method, url.path, urllib.parse.parse_qs(url.query), headers, body
+
+    async def write_response(self, writer, status, body, content_type='text/plain; charset=utf-8', headers=None,
+                             keep_alive=True):
+        if isinstance(body, str):
+            body = body.encode('utf-8')
+        lines = [f'HTTP/1.1 {status} {REASONS[status]}', f'Content-Type: {content_type}',
+                 f'Content-Length: {len(body)}', f'Connection: {"keep-alive" if keep_alive else "close"}']
+        lines.extend(f'{name}: {value}' for name, value in (headers or {}).items())
+        writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1') + body)
+        await writer.drain()
+
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                try:
+                    request = await self.read_request(reader)
+                    if request is None:
+                        break
+                    method, path, query, headers, body = request
+                    keep_alive = headers.get('connection', '').lower() != 'close'
+                    status, content_type, response, extra = await self.dispatch(method, path, query, headers, body)
+                except HttpError as e:
+                    await self.write_response(writer, e.status, f'{e}\n', keep_alive=False)
+                    break
+                await self.write_response(writer, status, response, content_type, extra, keep_alive)
+                if not keep_alive:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def dispatch(self, method, path, query, headers, body):
+        """returns (status, content type, body, extra headers)"""
+        if path == '/health':
+            return 200, 'text/plain; charset=utf-8', 'ok\n', None
+        if path == '/metrics':
+            return 200, 'text/plain; version=0.0.4', self.metrics.expose(), None
+        if path != '/render':
+            raise HttpError(404)
+        if method != 'POST':
+            raise HttpError(405)
+        start = time.perf_counter()
+        try:
+            status, content_type, response, extra = await self.render(query, headers, body)
+        except HttpError as e:
+            status, content_type, response, extra = e.status, 'text/plain; charset=utf-8', f'{e}\n', None
+            if e.errors is not None:
+                content_type = 'application/json'
+                response = json.dumps({'error': str(e), 'errors': e.errors}, ensure_ascii=False)
+            if status == 503:
+                extra = {'Retry-After': 1}
+        self.metrics.responses[status] = self.metrics.responses.get(status, 0) + 1
+        if status == 200:
+            self.metrics.request_seconds.observe(time.perf_counter() - start)
+        return status, content_type, response, extra
+
+    def parse_options(self, query):
+        """api.RenderOptions of a request, the server options with the query string applied"""
+        options = {}
+        for name, values in query.items():
+            if name not in OPTION_TYPES:
+                raise HttpError(400, f'unknown option {name}')
+            try:
+                options[name] = OPTION_TYPES[name](values[-1])
+            except ValueError:
+                raise HttpError(400, f'invalid option {name}={values[-1]}')
+        try:
+            # RenderOptions checks the values, inf or 0 would otherwise fail inside the worker
+            options = dataclasses.replace(self.options, **options)
+        except ValueError as e:
+            raise HttpError(400, f'invalid option: {e}')
+        return options
+
+    async def restart_pool(self, broken):
+        """every request in flight on a pool which lost a worker lands here, the first one replaces it"""
+        # start_pool sets self.pool before its first await, the other requests see the new pool
+        if self.pool is not broken:
+            return
+        broken.shutdown(wait=False)
+        try:
+            await self.start_pool()
+        except RuntimeError as e:
+            LOG.error(f'restart worker pool failed, err={e}')
+
+    async def render(self, query, headers, body):
+        options = self.parse_options(query)
+        is_json = 'json' in headers.get('content-type', '')
+        if self.metrics.inflight >= self.limit:
+            raise HttpError(503, f'{self.metrics.inflight} renders in progress, retry later')
+        self.metrics.inflight += 1
+        start = time.perf_counter()
+        try:
+            loop = asyncio.get_running_loop()
+            pool = self.pool
+            pdf, result, report = await loop.run_in_executor(pool, render_payload, body, is_json, options)
+        except BodyError as e:
+            raise HttpError(400, f'invalid resume: {e}')
+        except FitError as e:
+            raise HttpError(422, str(e))
+        except (GlyphError, MarkupError) as e:
+            raise HttpError(422, str(e), e.errors)
+        except LayoutError as e:
+            # a single table taller than the page, e.g. a huge font_size
+            raise HttpError(422, f'resume does not fit the page: {e}')
+        except (KeyError, TypeError, ValueError) as e:
+            raise HttpError(400, f'invalid resume: {e.__class__.__name__}: {e}')
+        except BrokenProcessPool:
+            # a worker died (oom killer...), start a new pool for the next requests
+            await self.restart_pool(pool)
+            raise HttpError(500, 'worker died')
+        except Exception as e:
+            LOG.exception(f'render failed, err={e}')
+            raise HttpError(500, f'render failed: {e.__class__.__name__}')
+        finally:
+            self.metrics.inflight -= 1
+        self.metrics.render_seconds.observe(result['seconds'])
+        self.metrics.queue_seconds.observe(max(0, time.perf_counter() - start - result['seconds']))
+        self.metrics.layouts.observe(result['layouts'])
+        self.metrics.observe_phases(report)
+        extra = {f'X-Resume-{name.replace("_", "-").title()}': value for name, value in result.items()}
+        return 200, 'application/pdf', pdf, extra
+
+    async def serve_forever(self):
+        await self.start_pool()
+        server = await asyncio.start_server(self.handle, self.host, self.port, limit=MAX_HEADER_SIZE)
+        print(f'serve on http://{self.host}:{self.port}, {self.workers} workers, '
+              f'{self.limit - self.workers} queued renders at most')
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            self.pool.shutdown()
+
+    def run(self):
+        try:
+            asyncio.run(self.serve_forever())
+        except KeyboardInterrupt:
+            pass
@@ -1,16 +1,36 @@
-import yaml
 import os
 import subprocess
 import logging
+import json
+import shutil
+import hashlib
+import tempfile
+import contextlib
+import configparser
 
 LOG = logging.getLogger(__name__)
 
 from cc_resume import Author
 
+def load_yaml(content):
+    # imported here so that the cli prompt does not pay for yaml
+    import yaml
+    # libyaml C loader is several times faster than the pure python one
+    loader = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+    return yaml.load(content, Loader=loader)
+
+
+def load_yaml_all(stream):
+    """documents of a multi document yaml stream, parsed one at a time while the file is read"""
+    import yaml
+    loader = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+    return yaml.load_all(stream, Loader=loader)
+
+
 def read_yaml(filepath, encoding='utf-8') -> dict:
     with open(filepath, 'r', encoding=encoding) as f:
         # data = yaml.load(f, Loader=yaml.FullLoader)
-        data = yaml.safe_load(f)
+        data = load_yaml(f)
     return data
 
 
@@ -73,20 +93,140 @@ def execute_command_on_host(cmd: str, shell=True, encoding="utf-8", timeout=None
     return execute_command(cmd, shell=shell, encoding=encoding, timeout=timeout, return_code_dict=return_code_dict)
 
 
-def crudini_set_config(ini_path: str, section: str, key: str, value: str, check_file_exist=True) -> (int, str):
+@contextlib.contextmanager
+def file_lock(path):
+    """exclusive lock for path, held by one process at a time
+
+    the lock file lives in the temp dir, path itself is replaced on write and the user's directory stays clean
+    """
+    name = hashlib.sha1(os.path.abspath(path).encode('utf-8')).hexdigest()[:16]
+    with open(os.path.join(tempfile.gettempdir(), f'cc-resume-{name}.lock'), 'a+') as f:
+        if os.name == 'nt':
+            import msvcrt
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+        else:
+            import fcntl
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if os.name == 'nt':
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+            else:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+def new_ini_parser() -> configparser.ConfigParser:
+    # strict=False: a duplicate key or section of a hand edited file keeps the last value, like oslo.config
+    parser = configparser.ConfigParser(interpolation=None, strict=False)
+    parser.optionxform = str  # keep key case
+    return parser
+
+
+def read_ini(ini_path: str) -> configparser.ConfigParser:
+    """parsed ini file, empty when it is missing or can not be parsed (e.g. no section header)"""
+    parser = new_ini_parser()
+    try:
+        parser.read(ini_path, encoding='utf-8')
+    except (configparser.Error, UnicodeDecodeError) as e:
+        LOG.warning(f'ignore broken ini {ini_path}, the defaults are used, err={e}')
+        return new_ini_parser()
+    return parser
+
+
+def ini_set_config(ini_path: str, section: str, values: dict, check_file_exist=True) -> (int, str):
+    """set values in section of the ini file, all of them are written in one atomic rename
+
+    the file is written back from the parsed values, comments are not kept and a file read_ini can not
+    parse is replaced by the new values only
+    """
     if check_file_exist:
         assert os.path.exists(ini_path), f"{ini_path} is not exist"
-    cmd = f'crudini --set {ini_path} "{section}" "{key}" {value}'
-    flag, content = execute_command(cmd, shell=True)
-    return flag, content
+    try:
+        with file_lock(ini_path):
+            parser = read_ini(ini_path)
+            if not parser.has_section(section):
+                parser.add_section(section)
+            for key, value in values.items():
+                parser.set(section, key, str(value))
+            fd, tmp_path = tempfile.mkstemp(prefix=f'.{os.path.basename(ini_path)}.', dir=os.path.dirname(ini_path))
+            try:
+                with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                    parser.write(f)
+                # mkstemp creates the file 0600, keep the mode of the file it replaces
+                if os.path.exists(ini_path):
+                    shutil.copymode(ini_path, tmp_path)
+                else:
+                    os.chmod(tmp_path, 0o644)
+                os.replace(tmp_path, ini_path)
+            except BaseException:
+                os.remove(tmp_path)
+                raise
+    except OSError as e:
+        LOG.error(f"set config {section} {values} in {ini_path} failed, err={e}")
+        return -1, str(e)
+    LOG.info(f"set config {section} {values} in {ini_path}")
+    return 0, ''
 
 
-def crudini_get_config(ini_path: str, section: str, key: str, check_file_exist=True) -> (int, str):
+def ini_get_config(ini_path: str, section: str, key: str, check_file_exist=True) -> (int, str):
     if check_file_exist:
         assert os.path.exists(ini_path), f"{ini_path} is not exist"
-    cmd = f'crudini --get {ini_path} "{section}" "{key}"'
-    flag, content = execute_command(cmd, shell=True)
-    return flag, content
+    parser = read_ini(ini_path)
+    if not parser.has_option(section, key):
+        return 1, f"Parameter not found: {key}"
+    return 0, parser.get(section, key)
+
+
+def file_sha256(path: str) -> str:
+    sha256 = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            sha256.update(chunk)
+    return sha256.hexdigest()
+
+
+def sync_tree(src_dir: str, dst_dir: str, manifest_path: str) -> list:
+    """copy new or changed files of src_dir into dst_dir, never overwrite a file the user has modified
+
+    manifest_path keeps {relative path: sha256 of the copied file}, a dst file whose hash is different
+    from the manifest was edited by the user and is left alone. returns the copied relative paths
+    """
+    try:
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        manifest = {}
+    old_manifest = dict(manifest)
+    copied = []
+    for root, dirs, files in os.walk(src_dir):
+        for name in files:
+            src_path = os.path.join(root, name)
+            rel_path = os.path.relpath(src_path, src_dir).replace(os.sep, '/')
+            dst_path = os.path.join(dst_dir, rel_path)
+            src_hash = file_sha256(src_path)
+            if manifest.get(rel_path) == src_hash and os.path.exists(dst_path):
+                continue
+            if os.path.exists(dst_path):
+                dst_hash = file_sha256(dst_path)
+                if dst_hash != src_hash and dst_hash != manifest.get(rel_path):
+                    LOG.info(f'keep user modified {dst_path}')
+                    continue
+                if dst_hash == src_hash:
+                    manifest[rel_path] = src_hash
+                    continue
+            os.makedirs(os.path.dirname(dst_path), exist_ok=True)
+            shutil.copy2(src_path, dst_path)
+            manifest[rel_path] = src_hash
+            copied.append(rel_path)
+    if manifest != old_manifest:
+        tmp_path = f'{manifest_path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(tmp_path, manifest_path)
+    return copied
 
 
 def completed(flag, dec, err=None, raise_flag=True, just_echo=False):
@@ -0,0 +1,137 @@
+import os
+import time
+import errno
+import select
+import struct
+import ctypes
+import ctypes.util
+
+from cc_resume import main
+from cc_resume.data import load_resume
+
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+EVENT_HEADER = struct.Struct('iIII')
+# editors often write a file in several steps, wait this long for the rest of them
+DEBOUNCE = 0.05
+
+
+class InotifyWatcher:
+    """linux inotify through ctypes, raises OSError where it is not available"""
+
+    def __init__(self, path):
+        libc_name = ctypes.util.find_library('c')
+        if not libc_name:
+            raise OSError(errno.ENOSYS, 'libc not found')
+        libc = ctypes.CDLL(libc_name, use_errno=True)
+        if not hasattr(libc, 'inotify_init1'):
+            raise OSError(errno.ENOSYS, 'inotify is not available')
+        self.fd = libc.inotify_init1(os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init1 failed')
+        if libc.inotify_add_watch(self.fd, os.fsencode(path), IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE) < 0:
+            os.close(self.fd)
+            raise OSError(ctypes.get_errno(), f'inotify_add_watch {path} failed')
+
+    def read_names(self, timeout):
+        names = set()
+        while select.select([self.fd], [], [], timeout)[0]:
+            data = os.read(self.fd, 64 * 1024)
+            offset = 0
+            while offset < len(data):
+                wd, mask, cookie, length = EVENT_HEADER.unpack_from(data, offset)
+                offset += EVENT_HEADER.size
+                names.add(os.fsdecode(data[offset:offset + length].rstrip(b'\0')))
+                offset += length
+            timeout = DEBOUNCE
+        return names
+
+    def wait(self):
+        """block until something in the directory changed, returns the changed file names"""
+        return self.read_names(None)
+
+
+class PollingWatcher:
+    def __init__(self, path, interval):
+        self.path = path
+        self.interval = interval
+        self.mtimes = self.scan()
+
+    def scan(self):
+        mtimes = {}
+        for name in os.listdir(self.path):
+            try:
+                mtimes[name] = os.stat(os.path.join(self.path, name)).st_mtime_ns
+            except FileNotFoundError:
+                continue
+        return mtimes
+
+    def wait(self):
+        while True:
+            time.sleep(self.interval)
+            mtimes = self.scan()
+            names = {name for name, mtime in mtimes.items() if self.mtimes.get(name) != mtime}
+            self.mtimes = mtimes
+            if names:
+                return names
+
+
+def changed_sections(old, new):
+    """top level keys whose data differs between two parsed resumes"""
+    old, new = old or {}, new or {}
+    return [name for name in dict.fromkeys(list(old) + list(new)) if old.get(name) != new.get(name)]
+
+
+class Watch:
+    """re-render a resume whenever its yaml is saved
+
+    the parsed yaml of every file is kept to report the changed sections, main.section_cache() is keyed by
+    section content so only the changed sections are built again, the fit starts from the last build
+    """
+
+    def __init__(self, config_dir, interval=0.5):
+        self.config_dir = config_dir
+        try:
+            self.watcher = InotifyWatcher(config_dir)
+            print(f'watch {config_dir} with inotify')
+        except OSError:
+            self.watcher = PollingWatcher(config_dir, interval)
+            print(f'watch {config_dir} by polling every {interval}s')
+        self.data = {}
+        for name in os.listdir(config_dir):
+            if name.endswith('.yaml'):
+                self.load(name)
+
+    def load(self, name):
+        try:
+            data = load_resume(os.path.join(self.config_dir, name), self.config_dir)
+        except Exception as e:
+            print(f'{name}: read yaml failed, {e}')
+            return None
+        self.data[name] = data
+        return data
+
+    def render(self, name):
+        old = self.data.get(name)
+        new = self.load(name)
+        if new is None:
+            return
+        changed = changed_sections(old, new)
+        if old is not None and not changed:
+            return
+        print(f'{name}: changed {", ".join(changed)}')
+        start = time.perf_counter()
+        try:
+            result = main.fit_one_page_pdf(os.path.join(self.config_dir, name), verbose=False)
+        except Exception as e:
+            print(f'{name}: generate failed, {e}')
+            return
+        print(f'{name}: font_size={result.font_size}, padding={result.padding}, layouts={result.layouts}, '
+              f'{time.perf_counter() - start:.2f}s, path is {result.output_path}')
+
+    def run(self):
+        while True:
+            for name in sorted(self.watcher.wait()):
+                if name.endswith('.yaml') and os.path.exists(os.path.join(self.config_dir, name)):
+                    self.render(name)
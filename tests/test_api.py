@@ -0,0 +1,64 @@
+import math
+
+import pytest
+
+from cc_resume.api import RenderOptions
+
+
+@pytest.mark.parametrize('options', [
+    dict(font_size=0),
+    dict(font_size=-5),
+    dict(font_size=math.inf),
+    dict(font_size=math.nan),
+    dict(font_size=3),
+    dict(min_font_size=0),
+    dict(min_font_size=16),
+    dict(title_padding=0),
+    dict(title_padding=0.5),
+    dict(title_padding=-3),
+    dict(extra_leading=-1),
+    dict(fill_ratio=0),
+    dict(fill_ratio=1.5),
+    dict(layout_mode='grid'),
+    dict(start_font_size=math.inf),
+    dict(fit_workers=-1),
+])
+def test_invalid_options(options):
+    with pytest.raises(ValueError):
+        RenderOptions(**options)
+
+
+def test_default_min_font_size():
+    assert RenderOptions().lowest_font_size == 11
+    assert RenderOptions(font_size=12, min_font_size=12).lowest_font_size == 12
+
+
+VARIANTS = [
+    {'name': 'zh'},
+    {'name': 'blue', 'title_color': '#1f6feb'},
+    {'name': 'small', 'font_size': 13},
+    {'name': 'small-green', 'font_size': 13, 'title_color': 'green'},
+    {'name': 'en', 'language': 'en'},
+    {'name': 'titles', 'titles': {'summary': 'About me'}},
+    {'name': 'stream', 'layout_mode': 'stream'},
+    {'name': 'loose', 'fill_ratio': 0.5, 'title_padding': 6},
+]
+
+
+# (entries, description chars), the last two fit a smaller size when searched from the first variant's size
+@pytest.mark.parametrize('entries, chars', [(1, 80), (3, 40), (3, 80), (4, 40)])
+def test_variants_match_standalone_renders(entries, chars, monkeypatch):
+    from reportlab import rl_config
+    from benchmarks.generate import generate_resume
+    from cc_resume import api
+
+    # no timestamps or random ids in the pdf, the bytes can be compared
+    monkeypatch.setattr(rl_config, 'invariant', 1)
+    data = generate_resume(entries, 2, chars, seed=entries)
+    options = RenderOptions(check_glyphs=False)
+    for result in api.render_variants(data, VARIANTS, options):
+        variant_data, variant_options = api.apply_variant(data, options, result.variant)
+        standalone = api.render(variant_data, variant_options)
+        assert (result.font_size, result.padding, result.leading) == \
+               (standalone.font_size, standalone.padding, standalone.leading), result.variant
+        assert result.pdf == standalone.pdf, result.variant
@@ -0,0 +1,138 @@
+import itertools
+from concurrent.futures import Future
+
+import pytest
+
+from cc_resume.fit import FitEngine, FitError, ParallelFitEngine
+from cc_resume.main import Layout
+
+HEIGHT = 800
+
+
+class FakeResume:
+    """content height base + per_font * font_size + padding_rows * padding on a HEIGHT high frame"""
+
+    def __init__(self, base, per_font, padding_rows=6):
+        self.base = base
+        self.per_font = per_font
+        self.padding_rows = padding_rows
+        self.calls = []
+
+    def content_height(self, font_size, padding):
+        return self.base + self.per_font * font_size + self.padding_rows * padding
+
+    def measure(self, font_size, padding, leading):
+        self.calls.append(font_size)
+        content_height = self.content_height(font_size, padding)
+        page = 1 if content_height <= HEIGHT else 2
+        return Layout(page, HEIGHT - content_height, HEIGHT, content_height, HEIGHT, 0, self.padding_rows)
+
+    def submit(self, font_size, padding, leading):
+        future = Future()
+        future.set_result(self.measure(font_size, padding, leading))
+        return future
+
+    def largest_fit(self, min_font_size=11, max_font_size=15, step=0.25, min_padding=1):
+        """brute force biggest font size of the step grid which fits with min_padding"""
+        font_size = max_font_size
+        while font_size >= min_font_size:
+            if self.content_height(font_size, min_padding) <= HEIGHT:
+                return font_size
+            font_size -= step
+        return None
+
+
+def engine(resume, **kwargs):
+    kwargs = dict(dict(max_font_size=15, min_font_size=11, max_padding=10), **kwargs)
+    return FitEngine(resume.measure, **kwargs)
+
+
+# per_font puts the largest fit on every part of the 11..15 range, the last one does not fit at all
+PER_FONT = (44, 46, 48.5, 50, 52, 55, 58, 61, 63.5)
+FITTING = PER_FONT[:-1]
+
+
+def test_solve_padding_boundaries():
+    fit = engine(FakeResume(0, 0))
+    # free space 30 on 6 rows measured at padding 10: up to 15, clamped to max_padding
+    assert fit.solve_padding(Layout(1, 0, HEIGHT, 770, HEIGHT, 0, 6), 10) == 10
+    # free -54 on 6 rows: padding 10 - 9 is exactly min_padding
+    assert fit.solve_padding(Layout(1, 0, HEIGHT, 854, HEIGHT, 0, 6), 10) == 1
+    # one more point over and padding 1 no longer fits
+    assert fit.solve_padding(Layout(1, 0, HEIGHT, 855, HEIGHT, 0, 6), 10) is None
+    # fractional paddings are floored to padding_step
+    assert fit.solve_padding(Layout(1, 0, HEIGHT, 815, HEIGHT, 0, 6), 10) == 7
+    # without padded rows the padding is free as long as the content fits
+    assert fit.solve_padding(Layout(1, 0, HEIGHT, HEIGHT, HEIGHT, 0, 0), 10) == 10
+    assert fit.solve_padding(Layout(1, 0, HEIGHT, HEIGHT + 1, HEIGHT, 0, 0), 10) is None
+
+
+@pytest.mark.parametrize('per_font', FITTING)
+def test_cold_fit_finds_the_largest_font_size(per_font):
+    resume = FakeResume(100, per_font)
+    # fill_ratio 1 is never filled, the search must end on the boundary
+    result = engine(resume, fill_ratio=1).fit()
+    assert result.font_size == resume.largest_fit()
+    assert resume.content_height(result.font_size, result.padding) <= HEIGHT
+    assert resume.content_height(result.font_size, result.padding + 1) > HEIGHT or result.padding == 10
+    assert result.layouts == len(resume.calls)
+
+
+@pytest.mark.parametrize('per_font, start', list(itertools.product(FITTING, [11, 11.75, 12.5, 13.25, 14, 14.75])))
+def test_warm_start_matches_cold_start(per_font, start):
+    resume = FakeResume(100, per_font)
+    cold = engine(resume, fill_ratio=1).fit()
+    warm = engine(resume, fill_ratio=1).fit(start_font_size=start)
+    assert (warm.font_size, warm.padding) == (cold.font_size, cold.padding)
+
+
+def test_warm_start_at_the_answer_is_cheaper():
+    resume = FakeResume(100, 52)
+    cold = engine(resume, fill_ratio=1).fit()
+    warm = engine(resume, fill_ratio=1).fit(start_font_size=cold.font_size)
+    assert warm.font_size == cold.font_size
+    assert warm.layouts < cold.layouts
+
+
+@pytest.mark.parametrize('per_font', FITTING)
+def test_filled_result_fits(per_font):
+    resume = FakeResume(100, per_font)
+    result = engine(resume).fit()
+    assert 11 <= result.font_size <= resume.largest_fit()
+    assert resume.content_height(result.font_size, result.padding) <= HEIGHT
+
+
+@pytest.mark.parametrize('start', [None, 11, 13])
+def test_fit_error_at_the_floor(start):
+    resume = FakeResume(100, PER_FONT[-1])
+    assert resume.largest_fit() is None
+    with pytest.raises(FitError, match='font_size>=11'):
+        engine(resume).fit(start_font_size=start)
+    assert 11 in resume.calls
+
+
+def test_sequential_search_does_not_build_candidates(monkeypatch):
+    def fail(*args):
+        raise AssertionError('candidates built without prefetch')
+
+    monkeypatch.setattr(FitEngine, 'bisect_candidates', fail)
+    monkeypatch.setattr(FitEngine, 'expand_candidates', fail)
+    engine(FakeResume(100, 52), fill_ratio=1).fit()
+    engine(FakeResume(100, 52), fill_ratio=1).fit(start_font_size=12)
+
+
+@pytest.mark.parametrize('per_font, start, fill_ratio', list(itertools.product(
+    PER_FONT, [None, 11, 12.25, 14.5], [0.8, 1])))
+@pytest.mark.parametrize('workers', [2, 4])
+def test_parallel_matches_sequential(per_font, start, fill_ratio, workers):
+    def outcome(fit_engine):
+        try:
+            result = fit_engine.fit(start_font_size=start)
+        except FitError:
+            return 'FitError', fit_engine.layouts
+        return result.font_size, result.padding, result.leading, result.layouts
+
+    expected = outcome(engine(FakeResume(100, per_font), fill_ratio=fill_ratio))
+    parallel = ParallelFitEngine(FakeResume(100, per_font).submit, 15, 11, 10, workers=workers, fill_ratio=fill_ratio)
+    assert outcome(parallel) == expected
+    assert parallel.speculative >= 0
@@ -0,0 +1,30 @@
+from cc_resume import manifest
+from cc_resume.manifest import BuildManifest
+
+INPUTS = {'yaml_sha256': 'a', 'fonts_sha256': {}, 'options': {'compact': False, 'check_glyphs': True}}
+RESULT = {'font_size': 14, 'padding': 6}
+
+
+def build(tmp_path):
+    pdf = tmp_path / 'author.pdf'
+    pdf.write_bytes(b'%PDF')
+    BuildManifest(str(tmp_path / 'manifest.json')).save(INPUTS, RESULT, str(pdf))
+    return BuildManifest(str(tmp_path / 'manifest.json')), str(pdf)
+
+
+def test_up_to_date(tmp_path):
+    saved, pdf = build(tmp_path)
+    assert saved.is_up_to_date(INPUTS, pdf)
+    assert not saved.is_up_to_date(dict(INPUTS, options={'compact': False, 'check_glyphs': False}), pdf)
+
+
+def test_another_engine_rebuilds(tmp_path, monkeypatch):
+    saved, pdf = build(tmp_path)
+    monkeypatch.setattr(manifest, 'engine_version', lambda: 'older')
+    assert not saved.is_up_to_date(INPUTS, pdf)
+    # the last fit still warm starts the search
+    assert saved.result == RESULT
+
+
+def test_engine_version_is_stable():
+    assert manifest.engine_version() == manifest.engine_version.__wrapped__()
@@ -0,0 +1,47 @@
+import pickle
+
+import pytest
+
+from benchmarks.generate import generate_resume
+from cc_resume import api
+from cc_resume.markup import MarkupError
+
+OPTIONS = api.RenderOptions(check_glyphs=False)
+
+
+def resume_with(**sections):
+    data = generate_resume(2, cjk_ratio=0)
+    data.update(sections)
+    return data
+
+
+def test_data_text_is_reported_with_its_path():
+    data = resume_with()
+    data['experience'][1]['description'][0] = '<b>not closed'
+    with pytest.raises(MarkupError) as e:
+        api.render(data, OPTIONS)
+    assert [path for path, _ in e.value.errors] == ['experience[1].description[0]']
+
+
+def test_template_text_is_reported_with_section_entry_and_cell():
+    skills = {'key': 'skills', 'title': 'Skills', 'rows': [{'cells': [{'text': '<b>{value}'}]}]}
+    data = resume_with(layout=['author', skills], skills=['python', 'go'])
+    with pytest.raises(MarkupError) as e:
+        api.render(data, OPTIONS)
+    (path, message), = e.value.errors
+    assert path == 'skills[0] rows[0].cells[0]'
+    assert "'<b>{value}'" in message
+
+
+def test_section_title_is_reported():
+    skills = {'key': 'skills', 'title': '<i>Skills', 'rows': [{'cells': [{'text': '{value}'}]}]}
+    with pytest.raises(MarkupError) as e:
+        api.render(resume_with(layout=['author', skills], skills=['python']), OPTIONS)
+    assert e.value.errors[0][0] == 'skills title'
+
+
+def test_markup_error_pickles_with_errors():
+    error = MarkupError('a: broken', [('a', 'broken')])
+    copy = pickle.loads(pickle.dumps(error))
+    assert str(copy) == 'a: broken'
+    assert copy.errors == [('a', 'broken')]
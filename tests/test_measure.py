@@ -0,0 +1,40 @@
+import io
+import itertools
+
+import pytest
+
+from benchmarks.generate import generate_resume
+from cc_resume import main
+
+RESUMES = [generate_resume(entries, 2, chars, cjk_ratio, seed=entries * 7 + chars)
+           for entries, chars, cjk_ratio in itertools.product((1, 4, 12), (60, 200), (0.0, 0.5))]
+
+
+@pytest.mark.parametrize('data', RESUMES)
+@pytest.mark.parametrize('font_size', (11, 15))
+@pytest.mark.parametrize('layout_mode', main.LAYOUT_MODES)
+def test_measure_matches_build(data, font_size, layout_mode):
+    """measure copies Frame.add/split of the pinned reportlab, a real build must end on the same page and y"""
+    pdf = main.CreatePdf(font_size, 6, extra_leading=1, output_path=io.BytesIO(), data=data, title_color='orange',
+                         layout_mode=layout_mode)
+    pdf.add_data()
+    layout = pdf.measure()
+    pdf.build(verbose=False)
+    assert layout.page == pdf.doc.page
+    assert layout.frame_y == pytest.approx(pdf.doc.frame._y)
+    assert layout.frame_bottom == pytest.approx(pdf.doc.frame._y1p)
+
+
+@pytest.mark.parametrize('layout_mode', main.LAYOUT_MODES)
+def test_cached_sections_build_again(layout_mode):
+    """a table moved to the next page by one build must not fail the next build which reuses the section"""
+    data = generate_resume(12)
+    pages = []
+    for _ in range(3):
+        pdf = main.CreatePdf(15, 10, extra_leading=1, output_path=io.BytesIO(), data=data, title_color='orange',
+                             layout_mode=layout_mode)
+        pdf.add_data()
+        pdf.build(verbose=False)
+        pages.append(pdf.doc.page)
+    assert pages[0] > 1
+    assert pages == [pages[0]] * 3
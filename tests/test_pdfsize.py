@@ -0,0 +1,130 @@
+import io
+import zlib
+
+import pytest
+
+from benchmarks.generate import generate_resume
+from cc_resume import api, pdfsize
+
+pypdf = pytest.importorskip('pypdf')
+
+OPTIONS = api.RenderOptions(check_glyphs=False)
+
+
+def read(pdf):
+    """(pages, text of every page) through a real pdf reader"""
+    reader = pypdf.PdfReader(io.BytesIO(pdf), strict=True)
+    return len(reader.pages), [page.extract_text() for page in reader.pages]
+
+
+def write_pdf(objects):
+    """a pdf of the object bodies with a plain xref table, object numbers from 1"""
+    out = bytearray(b'%PDF-1.4\n')
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += b'%d 0 obj\n' % number + body + b'\nendobj\n'
+    xref = len(out)
+    out += b'xref\n0 %d\n0000000000 65535 f \n' % (len(objects) + 1)
+    out += b''.join(b'%010d 00000 n \n' % offset for offset in offsets)
+    out += b'trailer\n<< /Root 1 0 R /Size %d >>\nstartxref\n%d\n%%%%EOF\n' % (len(objects) + 1, xref)
+    return bytes(out)
+
+
+def page_pdf(content_objects, extra_objects=()):
+    """catalog, pages, page with the content objects 4.., a helvetica font, then extra_objects"""
+    contents = b' '.join(b'%d 0 R' % (4 + i) for i in range(len(content_objects)))
+    font_number = 4 + len(content_objects)
+    return write_pdf([
+        b'<< /Type /Catalog /Pages 2 0 R >>',
+        b'<< /Type /Pages /Kids [ 3 0 R ] /Count 1 >>',
+        b'<< /Type /Page /Parent 2 0 R /MediaBox [ 0 0 300 100 ] /Contents [ %s ] '
+        b'/Resources << /Font << /F1 %d 0 R >> >> >>' % (contents, font_number),
+        *content_objects,
+        b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>',
+        *extra_objects,
+    ])
+
+
+def stream(header, data):
+    return header + b'\nstream\n' + data + b'\nendstream'
+
+
+@pytest.fixture(scope='module')
+def resumes():
+    return [generate_resume(entries, 2, chars, cjk_ratio, seed=entries) for entries, chars, cjk_ratio in
+            ((1, 80, 0.0), (2, 80, 0.5), (3, 40, 1.0))]
+
+
+def test_recompress_round_trip(resumes):
+    for data in resumes:
+        pdf = api.render(data, OPTIONS).pdf
+        compressed = pdfsize.recompress(pdf)
+        assert len(compressed) < len(pdf)
+        assert read(compressed) == read(pdf)
+        # every decodable stream is the same after the rewrite
+        decoded = [obj.decoded() for obj in pdfsize.read_objects(pdf)[1] if obj.stream is not None]
+        assert [obj.decoded() for obj in pdfsize.read_objects(compressed)[1] if obj.stream is not None] == decoded
+
+
+def test_breakdown_adds_up(resumes):
+    pdf = api.render(resumes[0], OPTIONS).pdf
+    sizes = pdfsize.breakdown(pdf)
+    assert sizes['total'] == len(pdf)
+    assert sum(sizes[kind] for kind in ('font_files', 'font_metrics', 'content', 'other')) == len(pdf)
+    assert sizes['font_files'] > sizes['content'] > 0
+
+
+def test_compact_render_keeps_the_text(resumes):
+    for data in resumes:
+        normal = api.render(data, OPTIONS)
+        compact = api.render(data, api.RenderOptions(check_glyphs=False, compact=True))
+        assert (compact.font_size, compact.padding) == (normal.font_size, normal.padding)
+        assert read(compact.pdf) == read(normal.pdf)
+        assert len(compact.pdf) < len(normal.pdf)
+        assert compact.breakdown['total'] == len(compact.pdf)
+        assert normal.breakdown is None
+
+
+@pytest.mark.parametrize('compact', [False, True])
+def test_merged_pdf_has_one_page_per_resume(resumes, compact):
+    options = api.RenderOptions(check_glyphs=False, compact=compact)
+    # the same resume twice shares every cached section table
+    datas = resumes + resumes[:1]
+    results = [api.render(data, options) for data in datas]
+    merged, page = api.render_merged(list(zip(datas, results)), options)
+    pages, texts = read(merged)
+    assert page == pages == len(datas)
+    assert texts == [read(result.pdf)[1][0] for result in results]
+    assert len(merged) < sum(len(result.pdf) for result in results)
+
+
+def test_streams_with_parameters_or_indirect_length_are_copied():
+    text = b'BT /F1 12 Tf 10 50 Td (hello) Tj ET'
+    # the same content behind a png predictor, an indirect length and plain flate
+    predicted = zlib.compress(b''.join(b'\x00' + text[i:i + 7].ljust(7) for i in range(0, len(text), 7)))
+    content = [
+        stream(b'<< /Length %d /Filter /FlateDecode /DecodeParms << /Predictor 12 /Columns 7 >> >>'
+               % len(predicted), predicted),
+        # its length is object 8, after the font
+        stream(b'<< /Length 8 0 R >>', b'BT /F1 12 Tf 10 30 Td (indirect) Tj ET'),
+        stream(b'<< /Length %d /Filter /FlateDecode >>' % len(zlib.compress(text)), zlib.compress(text)),
+    ]
+    pdf = page_pdf(content, [b'38'])
+    compressed = pdfsize.recompress(pdf)
+    assert read(compressed) == read(pdf) == (1, ['hello\nindirect\nhello'])
+    before, after = pdfsize.read_objects(pdf)[1], pdfsize.read_objects(compressed)[1]
+    # the predictor and the indirect length stream are untouched, the plain flate one is rewritten
+    assert [obj.stream for obj in after[3:5]] == [obj.stream for obj in before[3:5]]
+    assert after[5].decoded() == text
+    assert after[5].stream != before[5].stream
+    assert pdfsize.breakdown(pdf)['total'] == len(pdf)
+
+
+def test_xref_stream_is_refused():
+    pdf = page_pdf([stream(b'<< /Length 5 >>', b'BT ET')])
+    xref_at = int(pdfsize.STARTXREF.search(pdf).group(1))
+    # startxref pointing at an object instead of an xref table, as with a cross reference stream
+    pdf = pdf.replace(b'startxref\n%d' % xref_at, b'startxref\n%d' % pdf.index(b'1 0 obj'))
+    with pytest.raises(ValueError, match='xref stream'):
+        pdfsize.recompress(pdf)
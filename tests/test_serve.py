@@ -0,0 +1,154 @@
+import os
+import json
+import asyncio
+import dataclasses
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from benchmarks.generate import generate_resume
+from cc_resume import api, serve
+
+DATA = generate_resume(1, 2, 80, 0.0, seed=1)
+RESUME = json.dumps(DATA).encode('utf-8')
+JSON = {'content-type': 'application/json'}
+
+
+@pytest.fixture(scope='module')
+def server():
+    # the bundled fonts of a checkout may be stand-ins without the cjk glyphs
+    server = serve.RenderServer('127.0.0.1', 0, 2, 4, options=api.RenderOptions(check_glyphs=False,
+                                                                                  title_color='#1f6feb'))
+    asyncio.run(server.start_pool())
+    yield server
+    server.pool.shutdown()
+
+
+def test_every_worker_starts(capsys):
+    server = serve.RenderServer('127.0.0.1', 0, 3, 0)
+    asyncio.run(server.start_pool())
+    server.pool.shutdown()
+    assert capsys.readouterr().out == '3 workers ready\n'
+
+
+def test_start_fails_without_every_worker(monkeypatch):
+    barrier = multiprocessing.Barrier
+    # one party more than workers, the barrier never fills up
+    monkeypatch.setattr(serve.multiprocessing, 'Barrier', lambda parties, timeout: barrier(parties + 1, timeout=timeout))
+    monkeypatch.setattr(serve, 'START_TIMEOUT', 0.5)
+    with pytest.raises(RuntimeError, match='only 0 of 2 workers started'):
+        asyncio.run(serve.RenderServer('127.0.0.1', 0, 2, 0).start_pool())
+
+
+def post(server, query, body=RESUME):
+    async def dispatch():
+        return await server.dispatch('POST', '/render', query, JSON, body)
+    return asyncio.run(dispatch())
+
+
+def test_render(server):
+    status, content_type, pdf, extra = post(server, {})
+    assert (status, content_type) == (200, 'application/pdf')
+    assert pdf.startswith(b'%PDF') and extra['X-Resume-Page'] == 1
+
+
+@pytest.mark.parametrize('query', [
+    {'font_size': ['inf']}, {'font_size': ['0']}, {'min_font_size': ['nan']}, {'title_padding': ['-1']},
+    {'layout_mode': ['grid']}, {'font_size': ['big']}, {'compact': ['maybe']}, {'unknown': ['1']},
+])
+def test_invalid_options_are_400(server, query):
+    before = server.metrics.responses.get(400, 0)
+    status, _, message, _ = post(server, query)
+    assert status == 400 and 'option' in message
+    assert server.metrics.responses[400] == before + 1
+
+
+def test_too_big_font_is_422(server):
+    status, _, message, _ = post(server, {'font_size': ['1e9']})
+    assert status == 422
+    assert server.metrics.responses[422] >= 1
+    assert server.metrics.inflight == 0
+
+
+@pytest.mark.parametrize('body, message', [
+    (b'{"author": ', 'invalid resume: Expecting value'), (b'[1, 2]', 'invalid resume: top level must be a mapping'),
+])
+def test_invalid_body_is_400(server, body, message):
+    status, _, response, _ = post(server, {}, body)
+    assert status == 400 and response.startswith(message)
+
+
+def die(*args):
+    os._exit(1)
+
+
+def test_dead_worker_restarts_the_pool_once(monkeypatch):
+    server = serve.RenderServer('127.0.0.1', 0, 2, 4)
+    starts = []
+    start_pool = server.start_pool
+
+    async def counted_start_pool():
+        starts.append(server.pool)
+        await start_pool()
+
+    monkeypatch.setattr(server, 'start_pool', counted_start_pool)
+    monkeypatch.setattr(serve, 'render_payload', die)
+
+    async def run():
+        await server.start_pool()
+        broken = server.pool
+        responses = await asyncio.gather(*[server.dispatch('POST', '/render', {}, JSON, RESUME) for _ in range(4)])
+        return broken, responses
+
+    broken, responses = asyncio.run(run())
+    server.pool.shutdown()
+    assert [response[:2] for response in responses] == [(500, 'text/plain; charset=utf-8')] * 4
+    # the initial pool, then one restart for all four failed requests
+    assert starts == [None, broken]
+    assert server.pool is not broken and broken._shutdown_thread
+    assert server.metrics.inflight == 0
+
+
+def test_unexpected_error_is_500(server, monkeypatch):
+    def fail(*args):
+        raise RuntimeError('boom')
+
+    monkeypatch.setattr(serve, 'render_payload', fail)
+    # a thread runs the patched function, a worker process would not see it
+    with ThreadPoolExecutor(1) as pool:
+        monkeypatch.setattr(server, 'pool', pool)
+        status, _, message, _ = post(server, {})
+    assert (status, message) == (500, 'render failed: RuntimeError\n')
+    assert server.metrics.inflight == 0
+
+
+def test_query_overrides_the_server_options(server):
+    options = server.parse_options({'compact': ['true'], 'font_size': ['14'], 'layout_mode': ['stream']})
+    assert options == dataclasses.replace(server.options, compact=True, font_size=14, layout_mode='stream')
+    assert options.title_color == '#1f6feb' and not options.check_glyphs
+    assert server.parse_options({'check_glyphs': ['1']}).check_glyphs
+
+
+def test_compact(server):
+    normal, compact = post(server, {}), post(server, {'compact': ['1']})
+    assert compact[0] == 200
+    assert len(compact[2]) < len(normal[2])
+
+
+def broken_resume(**author):
+    return json.dumps(dict(DATA, author=dict(DATA['author'], **author))).encode('utf-8')
+
+
+def test_glyph_error_lists_the_fields(server):
+    status, content_type, body, _ = post(server, {'check_glyphs': ['yes']}, broken_resume(name='\U0001f600'))
+    assert (status, content_type) == (422, 'application/json')
+    assert ['author.name', '\U0001f600'] in json.loads(body)['errors']
+    # the server options do not check, the same resume renders with boxes
+    assert post(server, {}, broken_resume(name='\U0001f600'))[0] == 200
+
+
+def test_markup_error_lists_the_fields(server):
+    status, content_type, body, _ = post(server, {}, broken_resume(contact='<a href="x">mail'))
+    assert (status, content_type) == (422, 'application/json')
+    assert [path for path, _ in json.loads(body)['errors']] == ['author.contact']
@@ -0,0 +1,31 @@
+import logging
+
+from cc_resume import utils
+
+
+def test_duplicate_key_keeps_the_last_value(tmp_path):
+    ini = tmp_path / '.resume.conf'
+    ini.write_text('[resume]\nname = a.yaml\nname = b.yaml\n', encoding='utf-8')
+    assert utils.ini_get_config(str(ini), 'resume', 'name') == (0, 'b.yaml')
+    assert utils.ini_set_config(str(ini), 'resume', {'config_dir': '/tmp'}) == (0, '')
+    assert ini.read_text(encoding='utf-8') == '[resume]\nname = b.yaml\nconfig_dir = /tmp\n\n'
+
+
+def test_broken_ini_falls_back_to_the_defaults(tmp_path, caplog):
+    ini = tmp_path / '.resume.conf'
+    ini.write_text('name = a.yaml\n[resume]\n', encoding='utf-8')
+    with caplog.at_level(logging.WARNING):
+        assert utils.ini_get_config(str(ini), 'resume', 'name')[0] == 1
+    assert 'ignore broken ini' in caplog.text
+    # the rewrite keeps only what could be parsed, the new value
+    assert utils.ini_set_config(str(ini), 'resume', {'name': 'b.yaml'}) == (0, '')
+    assert utils.ini_get_config(str(ini), 'resume', 'name') == (0, 'b.yaml')
+
+
+def test_rewrite_drops_comments_and_keeps_the_mode(tmp_path):
+    ini = tmp_path / '.resume.conf'
+    ini.write_text('# my resumes\n[resume]\nname = a.yaml\n', encoding='utf-8')
+    ini.chmod(0o600)
+    utils.ini_set_config(str(ini), 'resume', {'name': 'b.yaml'})
+    assert ini.read_text(encoding='utf-8') == '[resume]\nname = b.yaml\n\n'
+    assert ini.stat().st_mode & 0o777 == 0o600